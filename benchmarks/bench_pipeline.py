@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on synthetic audio.
+
+Generates a deterministic recording, then times each stage of the pipeline
+separately: decode, transcription, keyword matching, splitting/export and
+metadata. Prints a JSON report with per-stage latency, throughput in
+audio-seconds per wall-second and peak RSS, so runs can be compared across
+commits.
+
+Example:
+    python benchmarks/bench_pipeline.py --segments 20 --output bench.json
+"""
+
+from pathlib import Path
+from typing import Optional
+import contextlib
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+import click
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import StubTranscriber, generate_recording
+from audio_processor import AudioProcessor
+from split_engines import OUTPUT_FORMAT_CHOICES, SPLIT_ENGINES, create_split_engine
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def decode(audio_file: Path) -> np.ndarray:
+    """Decode with ffmpeg like the pipeline does, falling back to the wave module."""
+    if shutil.which("ffmpeg"):
+        from audio_io import decode_pcm
+        return decode_pcm(audio_file)
+    with wave.open(str(audio_file), 'rb') as f:
+        return np.frombuffer(f.readframes(f.getnframes()), np.int16).astype(np.float32) / 32768.0
+
+def timed(stages: dict, name: str, audio_seconds: float, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    stages[name] = {
+        "seconds": round(elapsed, 4),
+        "audio_seconds_per_second": round(audio_seconds / elapsed, 2) if elapsed > 0 else None
+    }
+    return result
+
+@click.command()
+@click.option('--segments', type=int, default=10, help='Number of keyword segments (default: 10)')
+@click.option('--segment-seconds', type=float, default=30.0, help='Length of each segment (default: 30)')
+@click.option('--sample-rate', type=int, default=44100, help='Sample rate of the test audio (default: 44100)')
+@click.option('--decoy-keywords', type=int, default=0,
+              help='Extra keywords that never match, to measure matcher scaling (default: 0)')
+@click.option('--split-engine', type=click.Choice(list(SPLIT_ENGINES)), default='pydub',
+              help='Split engine to benchmark (default: pydub)')
+@click.option('--output-format', type=click.Choice(OUTPUT_FORMAT_CHOICES),
+              help='Format of the parts (default: the split engine default)')
+@click.option('--export-workers', type=int, default=1, help='Parallel part encoders (default: 1)')
+@click.option('--match-mode', default='token', help='Keyword match mode (default: token)')
+@click.option('--real-model', help='Time transcription with this Whisper model (e.g. tiny) instead of the stub')
+@click.option('--backend', default='whisper',
+              help='Inference backend for --real-model, e.g. whisper-int8 (default: whisper)')
+@click.option('--batch-size', type=int, default=1,
+              help='With --real-model, also time the batched engine and report its speedup (default: 1, off)')
+@click.option('--output', type=click.Path(dir_okay=False, path_type=Path), help='Write the JSON report here')
+def main(segments: int, segment_seconds: float, sample_rate: int, decoy_keywords: int,
+         split_engine: str, output_format: Optional[str], export_workers: int, match_mode: str,
+         real_model: Optional[str], backend: str, batch_size: int, output: Optional[Path]):
+    """Benchmark the split pipeline stage by stage on synthetic audio."""
+    work_dir = Path(tempfile.mkdtemp(prefix="split-bench-"))
+    # Pipeline progress goes to stderr so stdout only carries the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(work_dir, segments, segment_seconds, sample_rate, decoy_keywords,
+                     split_engine, export_workers, match_mode, real_model, backend, batch_size,
+                     output_format)
+
+    report_json = json.dumps(report, indent=2)
+    if output:
+        output.write_text(report_json + "\n", encoding='utf-8')
+    print(report_json)
+
+def run(work_dir: Path, segments: int, segment_seconds: float, sample_rate: int, decoy_keywords: int,
+        split_engine: str, export_workers: int, match_mode: str, real_model: Optional[str],
+        backend: str = "whisper", batch_size: int = 1, output_format: Optional[str] = None) -> dict:
+    """Run all stages once and return the report."""
+    try:
+        recording = generate_recording(work_dir / "synthetic.wav", segments=segments,
+                                       segment_seconds=segment_seconds, sample_rate=sample_rate)
+        audio_seconds = recording.duration
+        keywords = [recording.keyword] + [f"decoy{i}" for i in range(decoy_keywords)]
+        stages = {}
+
+        timed(stages, "decode", audio_seconds, decode, recording.audio_file)
+
+        transcriber = StubTranscriber(recording)
+        transcriber_name = "stub"
+        if real_model:
+            try:
+                from transcription import TranscriptionManager
+            except ImportError as e:
+                print(f"Whisper not available ({e}), using the stub transcriber")
+            else:
+                real = TranscriptionManager(model_name=real_model, backend=backend)
+                timed(stages, "model_load", audio_seconds, real.initialize_model)
+                timed(stages, "transcription", audio_seconds, real.transcribe, recording.audio_file)
+                transcriber_name = real_model
+                if batch_size > 1:
+                    # Same loaded model, only the engine differs
+                    real.batch_size = batch_size
+                    timed(stages, "transcription_batched", audio_seconds, real.transcribe,
+                          recording.audio_file)
+        # Downstream stages always use the known words so they see the same hits
+        transcription = transcriber.transcribe(recording.audio_file)
+        if "transcription" not in stages:
+            timed(stages, "transcription", audio_seconds, transcriber.transcribe, recording.audio_file)
+
+        processor = AudioProcessor(split_engine=create_split_engine(split_engine, output_format),
+                                   export_workers=export_workers, match_mode=match_mode)
+        occurrences = timed(stages, "find_keyword_occurrences", audio_seconds,
+                            processor.find_keyword_occurrences, transcription.words, keywords)
+        result = timed(stages, "process_audio", audio_seconds, processor.process_audio,
+                       recording.audio_file, keywords, occurrences, output_base_dir=work_dir / "output")
+        timed(stages, "save_metadata", audio_seconds, processor.save_metadata,
+              result.output_dir, recording.audio_file.stem, result, transcription.text,
+              transcription.language, keywords)
+
+        total = sum(stage["seconds"] for name, stage in stages.items()
+                    if name not in ("model_load", "transcription_batched"))
+        batch_speedup = None
+        if "transcription_batched" in stages:
+            batch_speedup = round(stages["transcription"]["seconds"] /
+                                  stages["transcription_batched"]["seconds"], 2)
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "segments": segments,
+                "segment_seconds": segment_seconds,
+                "sample_rate": sample_rate,
+                "keywords": len(keywords),
+                "words": len(transcription.words),
+                "split_engine": processor.split_engine.name,
+                "output_format": processor.split_engine.output_format,
+                "export_workers": export_workers,
+                "match_mode": match_mode,
+                "transcriber": transcriber_name,
+                "backend": backend if real_model else None,
+                "batch_size": batch_size
+            },
+            "audio_seconds": audio_seconds,
+            "keyword_hits": len(occurrences),
+            "parts": len(result.splits),
+            "stages": stages,
+            "batch_speedup": batch_speedup,
+            "total_seconds": round(total, 4),
+            "audio_seconds_per_second": round(audio_seconds / total, 2) if total > 0 else None,
+            "peak_rss_mb": peak_rss_mb()
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Command line startup benchmark.
+
+Times cold starts of invocations that never transcribe: --help, the resplit
+help and a run on an empty input directory. Each one runs in a fresh
+interpreter through split_on_keyword.py, like a user would start it. Also
+checks with -X importtime that none of them imports the ML stack. Exits
+with status 1 when a median exceeds --max-ms or a heavy module is
+imported, so it can guard against startup regressions.
+
+Example:
+    python benchmarks/bench_startup.py --runs 10 --output startup.json
+"""
+
+from pathlib import Path
+from typing import List, Optional
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import click
+
+from bench_pipeline import git_commit
+
+ENTRY_POINT = Path(__file__).resolve().parent.parent / "split_on_keyword.py"
+
+# Modules that must only be loaded once a file is actually transcribed
+HEAVY_MODULES = ("torch", "whisper", "faster_whisper", "numba", "tiktoken")
+
+def invocations(work_dir: Path) -> dict:
+    """Arguments of each timed invocation."""
+    (work_dir / "input").mkdir(exist_ok=True)
+    return {
+        "help": ["--help"],
+        "resplit_help": ["resplit", "--help"],
+        "empty_input": ["--keyword", "bench", "--input-dir", str(work_dir / "input"),
+                        "--output-dir", str(work_dir / "output")]
+    }
+
+def run_once(args: List[str], work_dir: Path, import_time: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if import_time else []) + [str(ENTRY_POINT)] + args
+    # settings.ini is written to the working directory
+    return subprocess.run(command, cwd=work_dir, capture_output=True, text=True, check=True)
+
+def imported_heavy_modules(stderr: str) -> List[str]:
+    """Top-level heavy modules in -X importtime output."""
+    found = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            module = line.rsplit("|", 1)[1].strip().split(".")[0]
+            if module in HEAVY_MODULES:
+                found.add(module)
+    return sorted(found)
+
+@click.command()
+@click.option('--runs', type=click.IntRange(min=1), default=5, help='Timed runs per invocation (default: 5)')
+@click.option('--max-ms', type=float, default=500.0,
+              help='Fail when the median start of an invocation is slower than this (default: 500)')
+@click.option('--output', type=click.Path(dir_okay=False, path_type=Path), help='Write the JSON report here')
+def main(runs: int, max_ms: float, output: Optional[Path]):
+    """Benchmark cold start of the command line for invocations that do not transcribe."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="split-startup-") as tmp:
+        work_dir = Path(tmp)
+        for name, args in invocations(work_dir).items():
+            # One untimed run warms the OS file cache and compiles bytecode
+            heavy = imported_heavy_modules(run_once(args, work_dir, import_time=True).stderr)
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                run_once(args, work_dir)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 1),
+                "min_ms": round(min(timings), 1),
+                "max_ms": round(max(timings), 1),
+                "heavy_imports": heavy
+            }
+
+    failures = [
+        name for name, result in results.items()
+        if result["median_ms"] > max_ms or result["heavy_imports"]
+    ]
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "max_ms": max_ms,
+        "invocations": results,
+        "failures": failures
+    }
+    report_json = json.dumps(report, indent=2)
+    if output:
+        output.write_text(report_json + "\n", encoding='utf-8')
+    print(report_json)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Deterministic synthetic test audio and a stub transcriber for benchmarks.
+
+The generated recording consists of equally long segments. Every segment is
+a tone with its own pitch plus a little noise, and starts with the keyword.
+The stub transcriber returns the known word timestamps for that recording,
+so the splitting stages always see the same keyword hits.
+"""
+
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List
+import wave
+import numpy as np
+
+FILLER_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+@dataclass
+class SyntheticRecording:
+    audio_file: Path
+    sample_rate: int
+    duration: float
+    keyword: str
+    words: List[dict] = field(default_factory=list)
+
+@dataclass
+class StubTranscription:
+    """Same layout as transcription.TranscriptionResult, without importing torch."""
+    text: str
+    language: str
+    segments: list
+    words: list
+
+def generate_recording(audio_file: Path, segments: int = 10, segment_seconds: float = 30.0,
+                       sample_rate: int = 44100, keyword: str = "marker", word_seconds: float = 0.5,
+                       seed: int = 0) -> SyntheticRecording:
+    """Write a mono 16-bit WAV file and return it with its known word timestamps."""
+    rng = np.random.default_rng(seed)
+    duration = segments * segment_seconds
+    words = []
+    chunks = []
+    segment_samples = int(segment_seconds * sample_rate)
+    t = np.arange(segment_samples) / sample_rate
+
+    for i in range(segments):
+        frequency = 220.0 * 2 ** (i % 12 / 12)
+        tone = 0.3 * np.sin(2 * np.pi * frequency * t) + 0.02 * rng.standard_normal(segment_samples)
+        chunks.append((np.clip(tone, -1, 1) * 32767).astype(np.int16))
+
+        offset = i * segment_seconds
+        position = 0.2
+        words.append({"word": f" {keyword.capitalize()}.", "start": offset + position,
+                      "end": offset + position + word_seconds * 0.8, "probability": 0.99})
+        position += word_seconds
+        while position + word_seconds < segment_seconds:
+            filler = FILLER_WORDS[int(rng.integers(len(FILLER_WORDS)))]
+            words.append({"word": f" {filler}", "start": offset + position,
+                          "end": offset + position + word_seconds * 0.8, "probability": 0.9})
+            position += word_seconds
+
+    with wave.open(str(audio_file), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for chunk in chunks:
+            f.writeframes(chunk.tobytes())
+
+    return SyntheticRecording(audio_file, sample_rate, duration, keyword, words)
+
+class StubTranscriber:
+    """Stands in for TranscriptionManager and returns the known words of a recording."""
+
+    model_name = "stub"
+
+    def __init__(self, recording: SyntheticRecording):
+        self.recording = recording
+
+    def transcribe(self, audio_file: Path, audio=None) -> StubTranscription:
+        words = [dict(word) for word in self.recording.words]
+        return StubTranscription(
+            text="".join(word["word"] for word in words),
+            language="en",
+            segments=[{"id": 0, "start": 0.0, "end": self.recording.duration,
+                       "text": "".join(word["word"] for word in words), "words": words}],
+            words=words
+        )
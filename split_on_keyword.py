@@ -1,24 +1,23 @@
 #!/usr/bin/env python3
 """
 Split Audio on Keyword - Command forwarding script.
-This script forwards all commands to the modular implementation in src/main.py.
+This script runs the modular implementation in src/main.py in this process.
 """
 
 import sys
-import subprocess
-import os
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent / 'src'
 
 def main():
-    if not os.path.exists('src/main.py'):
+    if not (SRC_DIR / 'main.py').exists():
         print("Error: src/main.py not found. Please ensure the modular version is installed.")
         sys.exit(1)
-    
-    # Forward all arguments to src/main.py
-    cmd = [sys.executable, 'src/main.py'] + sys.argv[1:]
-    try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        sys.exit(e.returncode)
+
+    # Import the CLI from src/ instead of starting a second interpreter
+    sys.path.insert(0, str(SRC_DIR))
+    from main import main as cli
+    cli(args=sys.argv[1:], prog_name=Path(sys.argv[0]).name)
 
 if __name__ == "__main__":
     main()
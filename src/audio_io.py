@@ -0,0 +1,189 @@
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+import json
+import subprocess
+import tempfile
+import numpy as np
+
+# Whisper expects 16 kHz mono input
+SAMPLE_RATE = 16000
+
+# Output format -> (file suffix, ffmpeg audio encoder)
+OUTPUT_FORMATS = {
+    "mp3": (".mp3", "libmp3lame"),
+    "ogg": (".ogg", "libvorbis"),
+    "opus": (".opus", "libopus"),
+    "flac": (".flac", "flac"),
+    "wav": (".wav", "pcm_s16le")
+}
+
+# Sample rates the Opus encoder accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Outputs per ffmpeg run in encode_parts, keeps the command line short enough for Windows
+MAX_OUTPUTS_PER_RUN = 64
+
+def encoder_args(output_format: str, bitrate: Optional[str] = None,
+                 sample_rate: Optional[int] = None) -> List[str]:
+    """ffmpeg output options that encode to output_format at bitrate (ignored for lossless formats)."""
+    args = ["-c:a", OUTPUT_FORMATS[output_format][1]]
+    if bitrate and output_format not in ("flac", "wav"):
+        args += ["-b:a", bitrate]
+    if output_format == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        args += ["-ar", "48000"]
+    return args
+
+def _run_ffmpeg(cmd: List[str], input_data=None) -> bytes:
+    """Run an ffmpeg/ffprobe command and return its stdout, raising on failure."""
+    try:
+        result = subprocess.run(cmd, input=input_data, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"{cmd[0]} failed: {e.stderr.decode(errors='replace').strip()}") from e
+    return result.stdout
+
+def probe_duration(audio_file: Path) -> float:
+    """Return the duration of an audio file in seconds using ffprobe."""
+    out = _run_ffmpeg([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(audio_file)
+    ])
+    return float(out.decode().strip())
+
+def probe_format(audio_file: Path) -> Tuple[int, int]:
+    """Return the sample rate and channel count of the first audio stream."""
+    out = _run_ffmpeg([
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels",
+        "-of", "json",
+        str(audio_file)
+    ])
+    stream = json.loads(out)["streams"][0]
+    return int(stream["sample_rate"]), int(stream["channels"])
+
+def decode_raw(audio_file: Path, raw_file: Path, sample_rate: int, channels: int) -> None:
+    """Decode an audio file to a headerless 16-bit PCM file, interleaved by channel."""
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-y", "-threads", "0",
+        "-i", str(audio_file),
+        "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate),
+        str(raw_file)
+    ])
+
+def decode_pcm(audio_file: Path, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """Decode an audio file to float32 PCM in a single ffmpeg pass.
+
+    Returns a 1-D array for mono, otherwise an array of shape (samples, channels).
+    """
+    out = _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", str(audio_file),
+        "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate),
+        "-"
+    ])
+    samples = np.frombuffer(out, np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return samples
+
+def stream_pcm(audio_file: Path, chunk_samples: int,
+               sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Decode an audio file to mono float32 PCM, yielding chunks of chunk_samples.
+
+    Only one chunk is held in memory at a time; the last chunk may be shorter.
+    """
+    process = subprocess.Popen([
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", str(audio_file),
+        "-f", "f32le", "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    chunk_bytes = chunk_samples * 4
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], np.float32)
+        process.wait()
+    finally:
+        # Consumer stopped early, no need to decode the rest
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_file}")
+
+def encode_pcm(samples: np.ndarray, sample_rate: int, output_file: Path,
+               output_args: Sequence[str] = ()) -> None:
+    """Encode float32 PCM to output_file with output_args, by default as its extension implies."""
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    # Contiguous slices are passed through without copying
+    data = np.ascontiguousarray(samples, dtype=np.float32).data.cast('B')
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-y",
+        "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate),
+        "-i", "-",
+        *output_args,
+        str(output_file)
+    ], input_data=data)
+
+def encode_frames(frames: np.ndarray, sample_rate: int, output_file: Path,
+                  output_args: Sequence[str] = (), chunk_frames: int = 1 << 16) -> None:
+    """Encode 16-bit PCM frames of shape (frames, channels) to output_file.
+
+    The frames are written to ffmpeg's stdin in chunks, so a view of a
+    memory-mapped file is streamed without being copied or read at once.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen([
+            "ffmpeg", "-nostdin", "-y", "-v", "error",
+            "-f", "s16le", "-ac", str(frames.shape[1]), "-ar", str(sample_rate),
+            "-i", "-",
+            *output_args,
+            str(output_file)
+        ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr)
+        try:
+            for start in range(0, len(frames), chunk_frames):
+                process.stdin.write(frames[start:start + chunk_frames].data.cast('B'))
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        finally:
+            process.wait()
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()}")
+
+def cut_copy(audio_file: Path, start: float, end: float, output_file: Path) -> None:
+    """Cut [start, end] seconds out of audio_file without re-encoding."""
+    start = max(start, 0.0)
+    end = max(end, start)
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-y",
+        "-ss", f"{start:.3f}", "-to", f"{end:.3f}",
+        "-i", str(audio_file),
+        "-map", "0:a", "-c", "copy",
+        str(output_file)
+    ])
+
+def encode_parts(audio_file: Path, parts: Sequence[Tuple[float, float, Path]],
+                 output_args: Sequence[str]) -> None:
+    """Write several (start, end, output_file) second ranges of audio_file with a single ffmpeg run.
+
+    The input is read and decoded once and every range is trimmed from the
+    same stream into its own output, so ranges may overlap. Runs are split
+    every MAX_OUTPUTS_PER_RUN ranges. With output_args ["-c", "copy"]
+    nothing is decoded and cuts snap to packets.
+    """
+    for first in range(0, len(parts), MAX_OUTPUTS_PER_RUN):
+        cmd = ["ffmpeg", "-nostdin", "-y", "-v", "error", "-i", str(audio_file)]
+        for start, end, output_file in parts[first:first + MAX_OUTPUTS_PER_RUN]:
+            start = max(start, 0.0)
+            end = max(end, start)
+            cmd += ["-map", "0:a", "-ss", f"{start:.3f}", "-to", f"{end:.3f}",
+                    *output_args, str(output_file)]
+        _run_ffmpeg(cmd)
@@ -1,10 +1,16 @@
 from pathlib import Path
 from dataclasses import dataclass
 from typing import List, Optional
-from pydub import AudioSegment
+from concurrent.futures import ThreadPoolExecutor
 from rich import print
 import json
-from utils import clean_text, format_time
+import os
+import time
+from utils import format_time
+from keyword_matcher import KeywordMatcher
+from split_engines import SplitEngine, PydubSplitEngine
+from metrics import Metrics
+from manifest import FileManifest
 
 @dataclass
 class SplitInfo:
@@ -13,6 +19,15 @@ class SplitInfo:
     end_time: float
     duration: float
     file: str
+    encode_seconds: Optional[float] = None
+
+@dataclass
+class SplitPlan:
+    part: int
+    start_ms: int
+    end_ms: int
+    start_time: float
+    end_time: float
 
 @dataclass
 class ProcessingResult:
@@ -21,129 +36,278 @@ class ProcessingResult:
     output_dir: Path
 
 class AudioProcessor:
-    def __init__(self, trim_seconds: float = 2.0, trim_before: bool = False):
+    def __init__(self, trim_seconds: float = 2.0, trim_before: bool = False,
+                 split_engine: Optional[SplitEngine] = None, export_workers: int = 1,
+                 match_mode: str = "token", verbosity: int = 0,
+                 metrics: Optional[Metrics] = None):
         self.trim_seconds = trim_seconds
         self.trim_before = trim_before
+        self.split_engine = split_engine or PydubSplitEngine()
+        self.export_workers = max(1, export_workers)
+        self.match_mode = match_mode
+        self.verbosity = verbosity
+        self._matchers = {}
+        self.metrics = metrics or Metrics()
+    
+    def get_matcher(self, keywords: List[str]) -> KeywordMatcher:
+        """Return the compiled matcher for keywords, building it on first use."""
+        key = tuple(keywords)
+        if key not in self._matchers:
+            self._matchers[key] = KeywordMatcher(keywords, mode=self.match_mode, verbosity=self.verbosity)
+        return self._matchers[key]
     
     def find_keyword_occurrences(self, words: List[dict], keywords: List[str]) -> List[dict]:
         """Find all occurrences of any keyword in the transcription."""
-        keyword_occurrences = []
+        with self.metrics.span("keyword_match", words=len(words), keywords=len(keywords)) as span:
+            occurrences = self.get_matcher(keywords).find(words)
+            span["matches"] = len(occurrences)
+        return occurrences
+    
+    def split_settings(self, keywords: List[str], end_keywords: Optional[List[str]] = None,
+                       trim_end_keyword_seconds: float = 2.0,
+                       trim_end_keyword_before: bool = False) -> dict:
+        """Settings that change where a file is split, recorded in its progress manifest."""
+        return {
+            "keywords": keywords,
+            "end_keywords": end_keywords,
+            "trim_seconds": self.trim_seconds,
+            "trim_before": self.trim_before,
+            "trim_end_keyword_seconds": trim_end_keyword_seconds,
+            "trim_end_keyword_before": trim_end_keyword_before,
+            "split_engine": self.split_engine.name,
+            "output_format": self.split_engine.output_format,
+            "bitrate": self.split_engine.bitrate,
+            "match_mode": self.match_mode
+        }
+    
+    def plan_split(self, part: int, start_time: float, audio_duration: float,
+                   end_keyword_occurrences: Optional[List[dict]] = None,
+                   trim_end_keyword_seconds: float = 2.0,
+                   trim_end_keyword_before: bool = False) -> SplitPlan:
+        """Compute the trimmed boundaries of the part starting at start_time."""
+        # Initialize end time and milliseconds
+        end_time = audio_duration
+        start_ms = int(start_time * 1000)
+        end_ms = int(end_time * 1000)
         
-        for word in words:
-            # Clean and normalize text for comparison
-            word_text = clean_text(word["word"])
-            
-            # Check each keyword
-            for keyword in keywords:
-                search_keyword = clean_text(keyword)
-                
-                # Debug print to help diagnose matches
-                print(f"Comparing - Word: '{word['word']}' -> '{word_text}', Keyword: '{keyword}' -> '{search_keyword}'")
-                
-                if search_keyword in word_text:
-                    # Add the matched keyword to the word info
-                    word_with_keyword = word.copy()
-                    word_with_keyword["matched_keyword"] = keyword
-                    keyword_occurrences.append(word_with_keyword)
-                    break  # Stop checking other keywords once we find a match
+        # Find the next end keyword after this timestamp
+        if end_keyword_occurrences:
+            for end_word in end_keyword_occurrences:
+                if end_word["start"] > start_time:
+                    # Found an end keyword after current timestamp
+                    end_word_time = end_word["start"]
+                    trim_ms = int(trim_end_keyword_seconds * 1000)
+                    
+                    if trim_end_keyword_before:
+                        # Remove seconds before the end keyword
+                        end_time = end_word_time
+                        end_ms = int(end_time * 1000) - trim_ms
+                    else:
+                        # Remove seconds after the end keyword
+                        end_time = end_word_time
+                        end_ms = int(end_time * 1000) + trim_ms
+                    break
         
-        return keyword_occurrences
+        # Apply trimming based on settings
+        trimmed_start_time = start_time
+        trim_ms = int(self.trim_seconds * 1000)
+        
+        if self.trim_before:
+            # Remove from end of previous segment
+            end_ms = int(end_time * 1000) - trim_ms
+            end_time -= self.trim_seconds
+        else:
+            # Remove from start of current segment
+            start_ms += trim_ms
+            trimmed_start_time += self.trim_seconds
+        
+        return SplitPlan(
+            part=part,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            start_time=trimmed_start_time,
+            end_time=end_time
+        )
+    
+    def export_part(self, plan: SplitPlan, output_file: Path,
+                    manifest: Optional[FileManifest] = None) -> float:
+        """Export a single part and return the time spent encoding it."""
+        # Encode under a temporary name so an interrupted export never leaves a truncated part
+        partial_file = output_file.with_name(f"{output_file.stem}.partial{output_file.suffix}")
+        with self.metrics.span("encode", output_file, part=plan.part, engine=self.split_engine.name) as span:
+            started = time.perf_counter()
+            self.split_engine.export(plan.start_ms, plan.end_ms, partial_file)
+            os.replace(partial_file, output_file)
+            elapsed = time.perf_counter() - started
+            span["bytes_written"] = output_file.stat().st_size
+        self.metrics.count("bytes_written", span["bytes_written"])
+        if manifest:
+            manifest.mark_part(plan.part, plan.start_ms, plan.end_ms, output_file, elapsed)
+        print(f"Saved {output_file} ({elapsed:.2f}s)")
+        return elapsed
+    
+    def export_parts(self, plans: List[SplitPlan], output_files: List[Path],
+                     manifest: Optional[FileManifest] = None) -> List[float]:
+        """Export several parts in one pass of the split engine.
+        
+        Returns each part's share of the joint encode time.
+        """
+        partial_files = [output_file.with_name(f"{output_file.stem}.partial{output_file.suffix}")
+                         for output_file in output_files]
+        with self.metrics.span("encode", output_files[0].parent, parts=len(plans),
+                               engine=self.split_engine.name) as span:
+            started = time.perf_counter()
+            self.split_engine.export_many([
+                (plan.start_ms, plan.end_ms, partial_file)
+                for plan, partial_file in zip(plans, partial_files)
+            ])
+            for partial_file, output_file in zip(partial_files, output_files):
+                os.replace(partial_file, output_file)
+            elapsed = (time.perf_counter() - started) / len(plans)
+            span["bytes_written"] = sum(output_file.stat().st_size for output_file in output_files)
+        self.metrics.count("bytes_written", span["bytes_written"])
+        for plan, output_file in zip(plans, output_files):
+            if manifest:
+                manifest.mark_part(plan.part, plan.start_ms, plan.end_ms, output_file, elapsed)
+            print(f"Saved {output_file}")
+        return [elapsed] * len(plans)
     
     def process_audio(self, input_file: Path, keywords: List[str], keyword_occurrences: List[dict],
                      output_base_dir: Path,
                      end_keyword_occurrences: Optional[List[dict]] = None,
                      trim_end_keyword_seconds: float = 2.0,
-                     trim_end_keyword_before: bool = False) -> ProcessingResult:
-        """Process audio file, splitting it at keyword occurrences."""
+                     trim_end_keyword_before: bool = False,
+                     manifest: Optional[FileManifest] = None,
+                     move_original: bool = True) -> ProcessingResult:
+        """Process audio file, splitting it at keyword occurrences.
+        
+        With a manifest, parts it records as exported are kept and only the
+        missing ones are encoded.
+        """
         # Create output directory for this file's results
         output_dir = output_base_dir / input_file.stem
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Load audio file
-        print("Loading audio file...")
-        audio = AudioSegment.from_file(input_file)
-        audio_duration = len(audio) / 1000.0  # Duration in seconds
-        
         splits_info = []
-        if keyword_occurrences:
-            print(f"Found {len(keyword_occurrences)} keyword occurrences")
-            for occ in keyword_occurrences:
-                print(f"- '{occ['matched_keyword']}' at {format_time(occ['start'])}")
-            
-            # Get timestamps for main keyword
-            timestamps = [word["start"] for word in keyword_occurrences]
-            
-            # Process each keyword occurrence
-            for i, start_time in enumerate(timestamps):
-                # Initialize end time and milliseconds
-                end_time = audio_duration
-                start_ms = int(start_time * 1000)
-                end_ms = int(end_time * 1000)
+        try:
+            if keyword_occurrences:
+                loaded = False
+                audio_duration = manifest.audio_duration if manifest else None
+                if audio_duration is None:
+                    audio_duration = self._load(input_file)
+                    loaded = True
+                    if manifest:
+                        manifest.mark("loaded", duration=audio_duration)
+                suffix = self.split_engine.output_suffix(input_file)
                 
-                # Find the next end keyword after this timestamp
-                if end_keyword_occurrences:
-                    for end_word in end_keyword_occurrences:
-                        if end_word["start"] > start_time:
-                            # Found an end keyword after current timestamp
-                            end_word_time = end_word["start"]
-                            trim_ms = int(trim_end_keyword_seconds * 1000)
-                            
-                            if trim_end_keyword_before:
-                                # Remove seconds before the end keyword
-                                end_time = end_word_time
-                                end_ms = int(end_time * 1000) - trim_ms
-                            else:
-                                # Remove seconds after the end keyword
-                                end_time = end_word_time
-                                end_ms = int(end_time * 1000) + trim_ms
-                            break
+                print(f"Found {len(keyword_occurrences)} keyword occurrences")
+                for occ in keyword_occurrences:
+                    print(f"- '{occ['matched_keyword']}' at {format_time(occ['start'])}")
                 
-                # Apply trimming based on settings
-                trimmed_start_time = start_time
-                trim_ms = int(self.trim_seconds * 1000)
+                # Compute all part boundaries up front
+                plans = [
+                    self.plan_split(
+                        i + 1, occ["start"], audio_duration,
+                        end_keyword_occurrences=end_keyword_occurrences,
+                        trim_end_keyword_seconds=trim_end_keyword_seconds,
+                        trim_end_keyword_before=trim_end_keyword_before
+                    )
+                    for i, occ in enumerate(keyword_occurrences)
+                ]
+                output_files = [output_dir / f"part_{plan.part}{suffix}" for plan in plans]
                 
-                if self.trim_before:
-                    # Remove from end of previous segment
-                    end_ms = int(end_time * 1000) - trim_ms
-                    end_time -= self.trim_seconds
-                else:
-                    # Remove from start of current segment
-                    start_ms += trim_ms
-                    trimmed_start_time += self.trim_seconds
+                # Parts exported by an earlier, interrupted run are kept
+                encode_times = [
+                    manifest.exported_part(plan.part, plan.start_ms, plan.end_ms, output_file) if manifest else None
+                    for plan, output_file in zip(plans, output_files)
+                ]
+                missing = [i for i, encode_seconds in enumerate(encode_times) if encode_seconds is None]
+                if len(missing) < len(plans):
+                    print(f"Keeping {len(plans) - len(missing)} part(s) exported earlier")
+                if missing and not loaded:
+                    self._load(input_file)
                 
-                # Extract segment
-                segment = audio[start_ms:end_ms]
+                # Encode parts; each worker slices its own segment, so at most
+                # export_workers segments are held in memory at once
+                def export(i: int) -> float:
+                    return self.export_part(plans[i], output_files[i], manifest)
                 
-                # Save segment
-                output_file = output_dir / f"part_{i+1}.mp3"
-                segment.export(output_file, format="mp3")
-                print(f"Saved {output_file}")
+                if self.split_engine.exports_together and len(missing) > 1:
+                    # One encoder run for all missing parts
+                    encode_seconds = self.export_parts([plans[i] for i in missing],
+                                                       [output_files[i] for i in missing], manifest)
+                    for i, seconds in zip(missing, encode_seconds):
+                        encode_times[i] = seconds
+                elif self.export_workers > 1 and len(missing) > 1:
+                    with ThreadPoolExecutor(max_workers=self.export_workers) as pool:
+                        for i, encode_seconds in zip(missing, pool.map(export, missing)):
+                            encode_times[i] = encode_seconds
+                else:
+                    for i in missing:
+                        encode_times[i] = export(i)
                 
                 # Record split information with trimmed timestamps
-                splits_info.append(SplitInfo(
-                    part=i + 1,
-                    start_time=trimmed_start_time,
-                    end_time=end_time,
-                    duration=(end_ms - start_ms) / 1000.0,
-                    file=output_file.name
-                ))
-            
-        else:
-            print(f"No keyword occurrences found in {input_file}")
+                for plan, output_file, encode_seconds in zip(plans, output_files, encode_times):
+                    splits_info.append(SplitInfo(
+                        part=plan.part,
+                        start_time=plan.start_time,
+                        end_time=plan.end_time,
+                        duration=(plan.end_ms - plan.start_ms) / 1000.0,
+                        file=output_file.name,
+                        encode_seconds=encode_seconds
+                    ))
+                if missing:
+                    workers = (1 if self.split_engine.exports_together
+                               else min(self.export_workers, len(missing)))
+                    print(f"Encoded {len(missing)} part(s) in {sum(encode_times[i] for i in missing):.2f}s "
+                          f"of encoder time using {workers} worker(s)")
+            else:
+                print(f"No keyword occurrences found in {input_file}")
+        finally:
+            # Release the engine's audio and any temporary file, also when an export failed
+            self.split_engine.close()
         
-        # Copy original file to output directory
-        new_input_location = output_dir / input_file.name
-        try:
-            # Try to move the file first
-            input_file.rename(new_input_location)
-            print(f"Moved original file to {output_dir}")
-        except OSError:
-            # If moving fails (e.g., across drives), copy instead
-            import shutil
-            shutil.copy2(input_file, new_input_location)
-            print(f"Copied original file to {output_dir}")
+        return self.finish_processing(input_file, output_dir, keyword_occurrences, splits_info,
+                                      move_original=move_original)
+    
+    def _load(self, input_file: Path) -> float:
+        """Load the input file into the split engine and return its duration."""
+        print(f"Loading audio file ({self.split_engine.name} engine)...")
+        with self.metrics.span("split_load", input_file, engine=self.split_engine.name):
+            return self.split_engine.load(input_file)
+    
+    def finish_processing(self, input_file: Path, output_dir: Path, keyword_occurrences: List[dict],
+                          splits_info: List[SplitInfo], move_original: bool = True) -> ProcessingResult:
+        """Move the original into output_dir and build the result with trimmed occurrences."""
+        if move_original:
+            self.move_original(input_file, output_dir)
         
         # Update keyword occurrences with trimmed timestamps
+        return ProcessingResult(
+            keyword_occurrences=self.trim_occurrences(keyword_occurrences),
+            splits=splits_info,
+            output_dir=output_dir
+        )
+    
+    def move_original(self, input_file: Path, output_dir: Path) -> None:
+        """Move the original file into its output directory, copying across drives."""
+        # Copy original file to output directory
+        new_input_location = output_dir / input_file.name
+        with self.metrics.span("move_original", input_file) as span:
+            try:
+                # Try to move the file first
+                input_file.rename(new_input_location)
+                span["copied"] = False
+                print(f"Moved original file to {output_dir}")
+            except OSError:
+                # If moving fails (e.g., across drives), copy instead
+                import shutil
+                shutil.copy2(input_file, new_input_location)
+                span["copied"] = True
+                print(f"Copied original file to {output_dir}")
+    
+    def trim_occurrences(self, keyword_occurrences: List[dict]) -> List[dict]:
+        """Keyword occurrences with the trim applied, as stored in the metadata."""
         trimmed_occurrences = []
         for i, occ in enumerate(keyword_occurrences):
             trimmed_occ = occ.copy()
@@ -156,44 +320,41 @@ class AudioProcessor:
                 trimmed_occ["start"] = occ["start"] + self.trim_seconds
                 trimmed_occ["end"] = occ["end"] + self.trim_seconds
             trimmed_occurrences.append(trimmed_occ)
-
-        return ProcessingResult(
-            keyword_occurrences=trimmed_occurrences,
-            splits=splits_info,
-            output_dir=output_dir
-        )
+        return trimmed_occurrences
     
     def save_metadata(self, output_dir: Path, base_name: str, result: ProcessingResult,
                      transcription_text: str, language: str, keywords: List[str],
                      end_keywords: Optional[List[str]] = None) -> None:
         """Save transcription and metadata to JSON and TXT files."""
-        # Save JSON metadata
-        json_data = {
-            "full_text": transcription_text,
-            "language": language,
-            "keywords": keywords,
-            "keyword_occurrences": result.keyword_occurrences,
-            "splits": [vars(split) for split in result.splits],
-            "end_keywords": end_keywords
-        }
+        with self.metrics.span("save_metadata", output_dir / base_name):
+            # Save JSON metadata
+            json_data = {
+                "full_text": transcription_text,
+                "language": language,
+                "keywords": keywords,
+                "keyword_occurrences": result.keyword_occurrences,
+                "splits": [vars(split) for split in result.splits],
+                "end_keywords": end_keywords
+            }
         
-        json_file = output_dir / f"{base_name}_transcription.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
-        print(f"Saved transcription data to {json_file}")
+            json_file = output_dir / f"{base_name}_transcription.json"
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, indent=2, ensure_ascii=False)
+            print(f"Saved transcription data to {json_file}")
         
-        # Save human-readable text version
-        txt_file = output_dir / f"{base_name}_transcription.txt"
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(f"Full Transcription:\n{transcription_text}\n\n")
-            f.write(f"Main Keywords: {', '.join(keywords)}\n")
-            if end_keywords:
-                f.write(f"End Keywords: {', '.join(end_keywords)}\n")
-            f.write(f"Found {len(result.keyword_occurrences)} occurrences at:\n")
-            for occ in result.keyword_occurrences:
-                f.write(f"- '{occ['matched_keyword']}' ({occ['word']}) at {format_time(occ['start'])}\n")
-            f.write("\nSplit Information:\n")
-            for split in result.splits:
-                f.write(f"- {split.file}: {format_time(split.start_time)} to {format_time(split.end_time)} "
-                       f"(duration: {format_time(split.duration)})\n")
-        print(f"Saved transcription text to {txt_file}")
+            # Save human-readable text version
+            txt_file = output_dir / f"{base_name}_transcription.txt"
+            with open(txt_file, 'w', encoding='utf-8') as f:
+                f.write(f"Full Transcription:\n{transcription_text}\n\n")
+                f.write(f"Main Keywords: {', '.join(keywords)}\n")
+                if end_keywords:
+                    f.write(f"End Keywords: {', '.join(end_keywords)}\n")
+                f.write(f"Found {len(result.keyword_occurrences)} occurrences at:\n")
+                for occ in result.keyword_occurrences:
+                    f.write(f"- '{occ['matched_keyword']}' ({occ['word']}) at {format_time(occ['start'])}\n")
+                f.write("\nSplit Information:\n")
+                for split in result.splits:
+                    f.write(f"- {split.file}: {format_time(split.start_time)} to {format_time(split.end_time)} "
+                           f"(duration: {format_time(split.duration)})\n")
+            print(f"Saved transcription text to {txt_file}")
+            self.metrics.count("bytes_written", json_file.stat().st_size + txt_file.stat().st_size)
@@ -0,0 +1,123 @@
+from typing import Any, Dict, Tuple, Union
+import numpy as np
+from rich import print
+
+# torch and whisper are imported when a model is loaded, so listing the
+# backends (e.g. for the command line) stays cheap
+
+class TranscriptionBackend:
+    """Loads a Whisper model and runs it, returning whisper.transcribe's result layout.
+
+    Every backend returns a dict with "text", "language" and "segments",
+    where each segment has "start", "end", "text" and "words", and each word
+    is {"word", "start", "end", "probability"} with times rounded to 10 ms.
+    """
+
+    name = ""
+    devices: Tuple[str, ...] = ("cpu", "cuda")
+    # Whether the model is a torch Whisper model usable by the batched engine
+    batchable = True
+
+    def load(self, model_name: str, device: str):
+        """Load the named model onto device and return it."""
+        raise NotImplementedError
+
+    def transcribe(self, model, audio: Union[str, np.ndarray], options: Dict[str, Any]) -> dict:
+        """Transcribe a file path or 16 kHz mono PCM with the options of TranscriptionManager."""
+        return model.transcribe(audio, **options)
+
+class WhisperBackend(TranscriptionBackend):
+    """The reference openai-whisper model in full precision."""
+
+    name = "whisper"
+
+    def load(self, model_name: str, device: str):
+        import whisper
+        return whisper.load_model(model_name).to(device)
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper with its linear layers dynamically quantized to int8.
+
+    Quantization happens at load time, no converted model files are needed.
+    The decoding and word timestamp code is the same as for "whisper".
+    """
+
+    name = "whisper-int8"
+    devices = ("cpu",)
+
+    def load(self, model_name: str, device: str):
+        import torch
+        import whisper
+        model = whisper.load_model(model_name, device="cpu")
+        # Whisper's Linear subclass only casts weights to the input dtype,
+        # which is a no-op in fp32; turn it into a plain Linear so it is quantized
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 engine from the faster-whisper package, int8 on CPU."""
+
+    name = "faster-whisper"
+    batchable = False
+
+    def load(self, model_name: str, device: str):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("The faster-whisper backend requires the faster-whisper package "
+                               "(pip install faster-whisper)")
+        compute_type = "float16" if device == "cuda" else "int8"
+        print(f"Using faster-whisper with {compute_type} weights")
+        return WhisperModel(model_name, device=device, compute_type=compute_type)
+
+    def transcribe(self, model, audio: Union[str, np.ndarray], options: Dict[str, Any]) -> dict:
+        # Greedy decoding like whisper.transcribe's defaults
+        segments_iter, info = model.transcribe(
+            audio,
+            language=options.get('language'),
+            word_timestamps=options.get('word_timestamps', True),
+            condition_on_previous_text=options.get('condition_on_previous_text', True),
+            beam_size=1
+        )
+        segments = []
+        for segment in segments_iter:
+            words = [{
+                "word": word.word,
+                "start": round(float(word.start), 2),
+                "end": round(float(word.end), 2),
+                "probability": float(word.probability)
+            } for word in segment.words or []]
+            if options.get('verbose'):
+                print(f"[{segment.start:.2f} --> {segment.end:.2f}] {segment.text}")
+            segments.append({
+                "id": len(segments),
+                "seek": segment.seek,
+                "start": float(segment.start),
+                "end": float(segment.end),
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+                "words": words
+            })
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": info.language,
+            "segments": segments
+        }
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+def create_backend(name: str) -> TranscriptionBackend:
+    """Instantiate the transcription backend registered under name."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown backend '{name}'. Available: {', '.join(BACKENDS)}")
@@ -0,0 +1,243 @@
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from collections import deque
+from multiprocessing.connection import wait
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from rich import print
+
+from audio_io import probe_duration
+from transcription import TranscriptionManager
+from audio_processor import AudioProcessor
+from pipeline import SplitOptions, run_file
+
+@dataclass
+class FileOutcome:
+    file: str
+    status: str  # "done" or "failed"
+    worker: int
+    seconds: float
+    output_dir: Optional[str] = None
+    splits: int = 0
+    error: Optional[str] = None
+    metrics: Optional[dict] = None
+
+def _worker_main(worker_id: int, conn, transcriber: TranscriptionManager, processor: AudioProcessor,
+                 options: SplitOptions, pipelined: bool, num_threads: int) -> None:
+    """Worker process loop: receive file paths, process them and send back outcomes."""
+    import torch
+    torch.set_num_threads(num_threads)
+    # The parent aggregates totals from all workers into the Prometheus file
+    metrics = processor.metrics
+    metrics.prometheus_file = None
+
+    while True:
+        try:
+            audio_file = conn.recv()
+        except EOFError:
+            break
+        if audio_file is None:
+            break
+
+        started = time.perf_counter()
+        before = metrics.snapshot()
+        try:
+            result = run_file(Path(audio_file), transcriber, processor, options, pipelined)
+            outcome = FileOutcome(
+                file=audio_file,
+                status="done",
+                worker=worker_id,
+                seconds=time.perf_counter() - started,
+                output_dir=str(result.output_dir),
+                splits=len(result.splits)
+            )
+        except Exception as e:
+            outcome = FileOutcome(
+                file=audio_file,
+                status="failed",
+                worker=worker_id,
+                seconds=time.perf_counter() - started,
+                error=f"{type(e).__name__}: {e}"
+            )
+        outcome.metrics = metrics.delta_since(before)
+        conn.send(outcome)
+
+class WorkerPool:
+    """Pool of worker processes that each keep their own Whisper model loaded.
+
+    Files are handed to idle workers one at a time, so the pool always knows
+    which file a worker was processing. If a worker dies, that file is
+    reported as failed and a replacement worker is started; other files are
+    unaffected. A worker that died while idle is replaced as well, and the
+    file meant for it stays queued.
+    """
+
+    def __init__(self, jobs: int, transcriber: TranscriptionManager, processor: AudioProcessor,
+                 options: SplitOptions, pipelined: bool = False,
+                 threads_per_job: Optional[int] = None):
+        self.jobs = jobs
+        self.worker_args = (transcriber, processor, options, pipelined,
+                            threads_per_job or max(1, (os.cpu_count() or 1) // jobs))
+        self.context = multiprocessing.get_context("spawn")
+        self.backlog = deque()
+        self.workers: Dict[int, tuple] = {}  # worker id -> (process, connection)
+        self.assigned: Dict[int, tuple] = {}  # worker id -> (file, start time)
+
+    def start(self) -> None:
+        """Start all worker processes."""
+        print(f"Starting {self.jobs} worker(s) with {self.worker_args[-1]} thread(s) each")
+        for worker_id in range(self.jobs):
+            self._start_worker(worker_id)
+
+    def _start_worker(self, worker_id: int) -> None:
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn) + self.worker_args,
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.workers[worker_id] = (process, parent_conn)
+
+    def submit(self, audio_file: Path) -> None:
+        """Queue a file; it is dispatched when a worker becomes idle."""
+        self.backlog.append(str(audio_file))
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.backlog or self.assigned)
+
+    def _dispatch(self) -> None:
+        # A copy, a worker found dead is replaced while iterating
+        for worker_id, (process, conn) in list(self.workers.items()):
+            if not self.backlog:
+                break
+            if worker_id not in self.assigned:
+                audio_file = self.backlog.popleft()
+                try:
+                    conn.send(audio_file)
+                except (BrokenPipeError, OSError):
+                    # The idle worker died; its replacement gets the file on the next dispatch
+                    print(f"[yellow]Worker {worker_id} died while idle, restarting it[/yellow]")
+                    self.backlog.appendleft(audio_file)
+                    self._handle_crash(worker_id, process)
+                    continue
+                self.assigned[worker_id] = (audio_file, time.perf_counter())
+
+    def poll(self, timeout: Optional[float] = None) -> List[FileOutcome]:
+        """Dispatch queued files and return the outcomes that arrived within timeout."""
+        self._dispatch()
+        waitables = {}
+        for worker_id, (process, conn) in self.workers.items():
+            waitables[conn] = worker_id
+            waitables[process.sentinel] = worker_id
+
+        outcomes = []
+        for ready in wait(list(waitables), timeout):
+            worker_id = waitables[ready]
+            process, conn = self.workers[worker_id]
+            if ready is conn:
+                try:
+                    outcome = conn.recv()
+                except (EOFError, OSError):
+                    continue  # Worker died, handled through its sentinel
+                self.assigned.pop(worker_id, None)
+                outcomes.append(outcome)
+            elif not process.is_alive() and self.workers[worker_id][0] is process:
+                outcomes.extend(self._handle_crash(worker_id, process))
+
+        self._dispatch()
+        return outcomes
+
+    def _handle_crash(self, worker_id: int, process) -> List[FileOutcome]:
+        """Report the file a dead worker was processing and start a replacement."""
+        outcomes = []
+        assignment = self.assigned.pop(worker_id, None)
+        if assignment:
+            audio_file, started = assignment
+            print(f"[red]Worker {worker_id} died (exit code {process.exitcode}) "
+                  f"while processing {Path(audio_file).name}[/red]")
+            outcomes.append(FileOutcome(
+                file=audio_file,
+                status="failed",
+                worker=worker_id,
+                seconds=time.perf_counter() - started,
+                error=f"Worker process died with exit code {process.exitcode}"
+            ))
+        self.workers[worker_id][1].close()
+        self._start_worker(worker_id)
+        return outcomes
+
+    def shutdown(self) -> None:
+        """Stop all workers after their current file."""
+        for process, conn in self.workers.values():
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process, conn in self.workers.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self.workers.clear()
+
+def order_longest_first(audio_files: List[Path]) -> List[Path]:
+    """Sort files by duration, longest first, so the batch does not end on one long file."""
+    def duration(audio_file: Path) -> float:
+        try:
+            return probe_duration(audio_file)
+        except (RuntimeError, ValueError, OSError):
+            # Fall back to the file size as a rough proxy
+            return audio_file.stat().st_size / 16000.0
+    durations = {audio_file: duration(audio_file) for audio_file in audio_files}
+    return sorted(audio_files, key=lambda f: durations[f], reverse=True)
+
+def write_summary(summary_file: Path, outcomes: List[FileOutcome]) -> None:
+    """Atomically write the batch summary JSON."""
+    data = {
+        "files": len(outcomes),
+        "done": sum(1 for o in outcomes if o.status == "done"),
+        "failed": sum(1 for o in outcomes if o.status == "failed"),
+        "results": [{k: v for k, v in asdict(o).items() if k != "metrics"} for o in outcomes]
+    }
+    fd, tmp_name = tempfile.mkstemp(dir=summary_file.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_name, summary_file)
+
+def run_batch(audio_files: List[Path], jobs: int, transcriber: TranscriptionManager,
+              processor: AudioProcessor, options: SplitOptions, pipelined: bool = False,
+              threads_per_job: Optional[int] = None) -> List[FileOutcome]:
+    """Process files across worker processes and collect the outcomes centrally."""
+    pool = WorkerPool(jobs, transcriber, processor, options, pipelined, threads_per_job)
+    summary_file = options.output_dir / "batch_summary.json"
+    outcomes = []
+
+    pool.start()
+    try:
+        for audio_file in order_longest_first(audio_files):
+            pool.submit(audio_file)
+        while pool.busy:
+            for outcome in pool.poll(timeout=1.0):
+                outcomes.append(outcome)
+                if outcome.metrics:
+                    processor.metrics.merge(outcome.metrics)
+                    processor.metrics.write_prometheus()
+                if outcome.status == "done":
+                    print(f"[green]Finished {Path(outcome.file).name} "
+                          f"({outcome.splits} parts, {outcome.seconds:.1f}s)[/green]")
+                else:
+                    print(f"[red]Failed {Path(outcome.file).name}: {outcome.error}[/red]")
+                write_summary(summary_file, outcomes)
+    finally:
+        pool.shutdown()
+
+    failed = sum(1 for o in outcomes if o.status == "failed")
+    print(f"Batch finished: {len(outcomes) - failed} done, {failed} failed. Summary: {summary_file}")
+    return outcomes
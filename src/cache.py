@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import Optional
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from rich import print
+
+# Bump when the stored layout changes so stale entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "split-audio-on-keyword"
+
+class TranscriptionCache:
+    """Persistent on-disk cache of transcription results.
+
+    Entries are keyed by the audio content hash plus everything that influences
+    the transcription (model, language, Whisper options), so renaming or moving
+    a file still hits the cache while changing the model does not.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 max_size_mb: Optional[float] = None,
+                 max_age_days: Optional[float] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_file(audio_file: Path, chunk_size: int = 1024 * 1024) -> str:
+        """Return the SHA-256 hex digest of the file contents."""
+        digest = hashlib.sha256()
+        with open(audio_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, audio_hash: str, model_name: str, language: Optional[str],
+                 options: dict) -> str:
+        """Build the cache key for an audio hash and transcription settings."""
+        key_data = {
+            "version": CACHE_FORMAT_VERSION,
+            "audio": audio_hash,
+            "model": model_name,
+            "language": language,
+            "options": options
+        }
+        encoded = json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached transcription data for key, or None on a miss."""
+        entry = self._entry_path(key)
+        try:
+            with gzip.open(entry, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Corrupt or truncated entry, drop it and treat as a miss
+            print(f"[yellow]Discarding unreadable cache entry {entry.name}[/yellow]")
+            entry.unlink(missing_ok=True)
+            return None
+
+        # Refresh mtime so eviction keeps recently used entries
+        os.utime(entry)
+        return data
+
+    def put(self, key: str, data: dict) -> None:
+        """Store transcription data under key and apply eviction limits."""
+        entry = self._entry_path(key)
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=float)
+            os.replace(tmp_name, entry)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove entries older than max_age_days, then oldest entries above max_size_mb."""
+        entries = []
+        for entry in self.cache_dir.glob('*.json.gz'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            for mtime, _, entry in entries:
+                if mtime < cutoff:
+                    entry.unlink(missing_ok=True)
+            entries = [e for e in entries if e[0] >= cutoff]
+
+        if self.max_size_mb is not None:
+            max_bytes = self.max_size_mb * 1024 * 1024
+            total = sum(size for _, size, _ in entries)
+            # Least recently used first
+            for _, size, entry in sorted(entries, key=lambda e: e[0]):
+                if total <= max_bytes:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
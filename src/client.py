@@ -0,0 +1,63 @@
+from pathlib import Path
+from typing import List, Optional
+import json
+import urllib.error
+import urllib.request
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class ServerError(Exception):
+    """The split server rejected a job or could not be reached."""
+
+def server_available(server_url: str, timeout: float = 2.0) -> bool:
+    """Return True if a split server answers on server_url."""
+    try:
+        with urllib.request.urlopen(f"{server_url.rstrip('/')}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+def submit_job(server_url: str, audio_file: Path, keywords: List[str], output_dir: Path,
+               end_keywords: Optional[List[str]] = None,
+               trim_remove_seconds: float = 2.0, trim_before: bool = False,
+               trim_end_keyword_remove_seconds: float = 2.0,
+               trim_end_keyword_before: bool = False,
+               split_engine: Optional[str] = None, output_format: Optional[str] = None,
+               bitrate: Optional[str] = None, match_mode: Optional[str] = None,
+               timeout: Optional[float] = None) -> dict:
+    """Submit a split job to a running server and return its result with the file metadata.
+    
+    Engine, format, bitrate and match mode left as None use the server's settings.
+    """
+    job = {
+        # The server may run in another working directory
+        "file": str(Path(audio_file).resolve()),
+        "keywords": keywords,
+        "output_dir": str(Path(output_dir).resolve()),
+        "end_keywords": end_keywords,
+        "trim_remove_seconds": trim_remove_seconds,
+        "trim_before": trim_before,
+        "trim_end_keyword_remove_seconds": trim_end_keyword_remove_seconds,
+        "trim_end_keyword_before": trim_end_keyword_before
+    }
+    optional = {"split_engine": split_engine, "output_format": output_format,
+                "bitrate": bitrate, "match_mode": match_mode}
+    job.update((key, value) for key, value in optional.items() if value is not None)
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/jobs",
+        data=json.dumps(job).encode('utf-8'),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            error = json.load(e).get("error", str(e))
+        except ValueError:
+            error = str(e)
+        raise ServerError(f"Server rejected {Path(audio_file).name}: {error}") from e
+    except urllib.error.URLError as e:
+        raise ServerError(f"Could not reach split server at {server_url}: {e.reason}") from e
@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Tuple
+from rich import print
+from utils import clean_text
+
+# "token": whole-word and multi-word phrase matching through a hashed index
+# "substring": legacy behaviour, a keyword matches any word containing it
+MATCH_MODES = ("token", "substring")
+
+class KeywordMatcher:
+    """Precompiled matcher for a fixed list of keywords.
+
+    Keywords are normalized once. In token mode single-word keywords are
+    looked up in a dict keyed by the normalized word, and multi-word keywords
+    are indexed by their first token and checked against the following words.
+    When several keywords match at the same word, the one listed first wins.
+
+    Words can be passed in one go with find(), or incrementally with feed()
+    and flush(); both produce the same occurrences.
+    """
+
+    def __init__(self, keywords: List[str], mode: str = "token", verbosity: int = 0):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{mode}'. Available: {', '.join(MATCH_MODES)}")
+        self.keywords = keywords
+        self.mode = mode
+        self.verbosity = verbosity
+        self.max_tokens = 1
+
+        if mode == "substring":
+            self._search_terms = [(keyword, clean_text(keyword)) for keyword in keywords]
+            # Transcripts repeat words a lot, remember the result per normalized word
+            self._memo: Dict[str, Optional[str]] = {}
+        else:
+            # first token -> [(tokens, keyword)] in keyword priority order
+            self._index: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+            for keyword in keywords:
+                tokens = tuple(t for t in (clean_text(part) for part in keyword.split()) if t)
+                if not tokens:
+                    continue
+                self._index.setdefault(tokens[0], []).append((tokens, keyword))
+                self.max_tokens = max(self.max_tokens, len(tokens))
+
+        self._pending: List[Tuple[dict, str]] = []
+
+    def _match_substring(self, word: dict, word_text: str) -> Optional[str]:
+        if word_text in self._memo and self.verbosity < 2:
+            return self._memo[word_text]
+        matched = None
+        for keyword, search_keyword in self._search_terms:
+            if self.verbosity >= 2:
+                print(f"Comparing - Word: '{word['word']}' -> '{word_text}', "
+                      f"Keyword: '{keyword}' -> '{search_keyword}'")
+            if search_keyword in word_text:
+                matched = keyword
+                break
+        self._memo[word_text] = matched
+        return matched
+
+    def _match_at_head(self) -> Tuple[Optional[dict], int]:
+        """Try to match a keyword at the first pending word.
+
+        Returns the occurrence (or None) and the number of pending words it
+        consumes.
+        """
+        word, word_text = self._pending[0]
+
+        if self.mode == "substring":
+            keyword = self._match_substring(word, word_text)
+            if keyword is None:
+                return None, 1
+            occurrence = word.copy()
+            occurrence["matched_keyword"] = keyword
+            return occurrence, 1
+
+        for tokens, keyword in self._index.get(word_text, ()):
+            if len(tokens) > len(self._pending):
+                continue
+            following = tuple(text for _, text in self._pending[1:len(tokens)])
+            if self.verbosity >= 2:
+                print(f"Comparing - Words: '{' '.join(text for _, text in self._pending[:len(tokens)])}', "
+                      f"Keyword: '{keyword}' -> '{' '.join(tokens)}'")
+            if following == tokens[1:]:
+                matched_words = [w for w, _ in self._pending[:len(tokens)]]
+                occurrence = word.copy()
+                if len(tokens) > 1:
+                    occurrence["word"] = "".join(w["word"] for w in matched_words)
+                    occurrence["end"] = matched_words[-1]["end"]
+                occurrence["matched_keyword"] = keyword
+                return occurrence, len(tokens)
+        return None, 1
+
+    def _drain(self, final: bool) -> List[dict]:
+        occurrences = []
+        while self._pending and (final or len(self._pending) >= self.max_tokens):
+            occurrence, consumed = self._match_at_head()
+            if occurrence is not None:
+                if self.verbosity >= 1:
+                    print(f"Matched '{occurrence['word'].strip()}' -> '{occurrence['matched_keyword']}' "
+                          f"at {occurrence['start']:.2f}s")
+                occurrences.append(occurrence)
+            del self._pending[:consumed]
+        return occurrences
+
+    def feed(self, word: dict) -> List[dict]:
+        """Add the next transcribed word and return any occurrences that are now complete."""
+        word_text = clean_text(word["word"])
+        # Words without letters or digits never start or continue a phrase
+        if not word_text and self.mode == "token":
+            return []
+        self._pending.append((word, word_text))
+        return self._drain(final=False)
+
+    @property
+    def horizon(self) -> Optional[float]:
+        """Start time of the earliest word still buffered, or None if nothing is pending."""
+        return self._pending[0][0]["start"] if self._pending else None
+
+    def flush(self) -> List[dict]:
+        """Match the words still buffered at the end of the transcript."""
+        return self._drain(final=True)
+
+    def find(self, words: List[dict]) -> List[dict]:
+        """Return all keyword occurrences in a complete list of words."""
+        self._pending = []
+        occurrences = []
+        for word in words:
+            occurrences.extend(self.feed(word))
+        occurrences.extend(self.flush())
+        return occurrences
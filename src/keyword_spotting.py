@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+from utils import clean_text
+
+class CandidateFinder:
+    """Finds words in a rough transcript that may be one of the keywords.
+
+    The coarse model often misspells or splits words, so matching is
+    deliberately tolerant: a word is a candidate when it is similar to any
+    token of a keyword, or to a whole keyword written without spaces.
+    False candidates only cost a short confirmation window.
+    """
+
+    def __init__(self, keywords: List[str], min_similarity: float = 0.75):
+        self.min_similarity = min_similarity
+        terms = set()
+        for keyword in keywords:
+            tokens = [t for t in (clean_text(part) for part in keyword.split()) if t]
+            terms.update(tokens)
+            if len(tokens) > 1:
+                terms.add("".join(tokens))
+        self.terms = sorted(terms)
+        self._memo: Dict[str, bool] = {}
+
+    def is_candidate(self, word_text: str) -> bool:
+        if word_text not in self._memo:
+            self._memo[word_text] = any(
+                term in word_text or SequenceMatcher(None, term, word_text).ratio() >= self.min_similarity
+                for term in self.terms
+            )
+        return self._memo[word_text]
+
+    def find(self, words: List[dict]) -> List[dict]:
+        """Return the words that may be a keyword or part of one."""
+        candidates = []
+        for word in words:
+            text = clean_text(word["word"])
+            if text and self.is_candidate(text):
+                candidates.append(word)
+        return candidates
+
+def candidate_windows(candidates: List[dict], context: float,
+                      duration: float) -> List[Tuple[float, float]]:
+    """Windows of context seconds around every candidate, merged where they overlap."""
+    windows: List[Tuple[float, float]] = []
+    for word in sorted(candidates, key=lambda w: w["start"]):
+        start = max(0.0, word["start"] - context)
+        end = min(duration, word["end"] + context)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+def merge_segments(coarse_segments: List[dict], windows: List[Tuple[float, float]],
+                   window_words: List[List[dict]]) -> List[dict]:
+    """Replace the coarse words inside each window by the words of the confirmation pass.
+
+    window_words holds the confirmed words of every window. Returns segments
+    in time order, one per window plus the runs of coarse words between the
+    windows, so the words of all segments taken together are sorted by start.
+    """
+    starts = [start for start, _ in windows]
+
+    def in_window(word: dict) -> bool:
+        return any(start <= word["start"] < end for start, end in windows)
+
+    segments = []
+    for segment in coarse_segments:
+        # Cut the segment at every window, so its words before and after a
+        # window become separate segments that sort around the window's words
+        runs: List[List[dict]] = []
+        region = None
+        for word in segment["words"]:
+            if in_window(word):
+                region = None
+                continue
+            word_region = bisect_right(starts, word["start"])
+            if word_region != region:
+                runs.append([])
+                region = word_region
+            runs[-1].append(word)
+        for words in runs:
+            segments.append(dict(segment, words=words,
+                                 text="".join(word["word"] for word in words),
+                                 start=words[0]["start"], end=words[-1]["end"]))
+    for words in window_words:
+        if words:
+            segments.append({
+                "start": words[0]["start"],
+                "end": words[-1]["end"],
+                "text": "".join(word["word"] for word in words),
+                "words": words
+            })
+    segments.sort(key=lambda segment: segment["start"])
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+    return segments
@@ -6,18 +6,29 @@ from rich.console import Console
 from rich.progress import track
 
 from config import Config
-from transcription import TranscriptionManager
+from cache import TranscriptionCache, DEFAULT_CACHE_DIR
 from audio_processor import AudioProcessor
+from split_engines import OUTPUT_FORMAT_CHOICES, SPLIT_ENGINES, create_split_engine
+from keyword_matcher import MATCH_MODES
+from client import server_available, submit_job, DEFAULT_HOST, DEFAULT_PORT
+from metrics import Metrics, profile_to
+from backends import BACKENDS
 from utils import ensure_directories, get_audio_files
 
 console = Console()
 
-@click.command()
+@click.group(invoke_without_command=True)
+@click.pass_context
 @click.option('--keyword', help='Keyword(s) to split on (comma-separated, overrides settings.ini)')
 @click.option('--model', 
              type=click.Choice(['tiny', 'base', 'small', 'medium', 'large']),
              default='base',
              help='Whisper model to use (default: base)')
+@click.option('--backend',
+             type=click.Choice(list(BACKENDS)),
+             default='whisper',
+             help='Inference backend: whisper, whisper-int8 (int8 quantized, CPU) or '
+                  'faster-whisper (requires the faster-whisper package) (default: whisper)')
 @click.option('--language',
              help='Language code for transcription (e.g., "en" for English, "de" for German)')
 @click.option('--trim-remove-seconds',
@@ -42,84 +53,396 @@ console = Console()
 @click.option('--output-dir',
              type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
              help='Output directory (overrides settings.ini)')
-def main(keyword: str, model: str, language: str, 
+@click.option('--recursive',
+             is_flag=True,
+             help='Also process audio files in subdirectories of the input directory')
+@click.option('--no-cache',
+             is_flag=True,
+             help='Always run Whisper instead of reusing cached transcriptions')
+@click.option('--cache-dir',
+             type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+             default=DEFAULT_CACHE_DIR,
+             help=f'Directory for cached transcriptions (default: {DEFAULT_CACHE_DIR})')
+@click.option('--cache-max-size-mb',
+             type=float,
+             default=2048.0,
+             help='Evict least recently used cache entries above this size (default: 2048)')
+@click.option('--cache-max-age-days',
+             type=float,
+             help='Evict cache entries not used for this many days (default: never)')
+@click.option('--split-engine',
+             type=click.Choice(list(SPLIT_ENGINES)),
+             default='pydub',
+             help='How parts are cut: pydub (decode and re-encode), ffmpeg-copy (stream copy, '
+                  'no re-encoding), ffmpeg (re-encode all parts in one ffmpeg run), pcm (decode '
+                  'once, shared with Whisper) or mmap (decode to a memory-mapped file on disk, for '
+                  'very long recordings) (default: pydub)')
+@click.option('--output-format',
+             type=click.Choice(OUTPUT_FORMAT_CHOICES),
+             help='Format of the parts: mp3, ogg, opus, flac, wav, or source to stream-copy the '
+                  'source format (selects ffmpeg-copy) (default: mp3, source for ffmpeg-copy)')
+@click.option('--bitrate',
+             help='Bitrate of the parts, e.g. 128k; ignored for flac, wav and source '
+                  '(default: encoder default)')
+@click.option('--export-workers',
+             type=click.IntRange(min=1),
+             default=1,
+             help='Number of parts to encode concurrently (default: 1)')
+@click.option('--stream',
+             is_flag=True,
+             help='Transcribe in overlapping windows so memory stays bounded on long recordings')
+@click.option('--stream-window',
+             type=click.FloatRange(min=1.0),
+             default=30.0,
+             help='Window length in seconds for --stream (default: 30)')
+@click.option('--stream-overlap',
+             type=click.FloatRange(min=0.0),
+             default=5.0,
+             help='Overlap between windows in seconds for --stream (default: 5)')
+@click.option('--pipeline',
+             is_flag=True,
+             help='Export each part as soon as its end-keyword is transcribed (implies --stream)')
+@click.option('--vad',
+             is_flag=True,
+             help='Only transcribe speech regions found by voice activity detection')
+@click.option('--vad-threshold-db',
+             type=float,
+             default=12.0,
+             help='How far above the noise floor audio counts as speech, in dB (default: 12)')
+@click.option('--vad-padding',
+             type=click.FloatRange(min=0.0),
+             default=0.5,
+             help='Seconds of audio kept before and after each speech region (default: 0.5)')
+@click.option('--vad-min-silence',
+             type=click.FloatRange(min=0.0),
+             default=1.0,
+             help='Shorter pauses do not end a speech region, in seconds (default: 1.0)')
+@click.option('--spot-model',
+             type=click.Choice(['tiny', 'base', 'small', 'medium', 'large']),
+             help='Find keyword candidates with this smaller model and run --model only around them')
+@click.option('--spot-context',
+             type=click.FloatRange(min=0.5),
+             default=3.0,
+             help='Seconds around each keyword candidate transcribed with --model (default: 3)')
+@click.option('--batch-size',
+             type=click.IntRange(min=1),
+             default=1,
+             help='Decode this many 30 s windows at once, across files (default: 1, off)')
+@click.option('--prefetch',
+             type=click.IntRange(min=0),
+             default=0,
+             help='Decode this many upcoming files in the background while the current one is '
+                  'transcribed (default: 0, off)')
+@click.option('--prefetch-memory-mb',
+             type=click.FloatRange(min=1.0),
+             default=1024.0,
+             help='Upper bound for decoded audio held by --prefetch, in MB (default: 1024)')
+@click.option('--jobs',
+             type=click.IntRange(min=1),
+             default=1,
+             help='Number of files to process in parallel worker processes (default: 1)')
+@click.option('--threads-per-job',
+             type=click.IntRange(min=1),
+             help='Torch threads per worker process (default: CPU count divided by --jobs)')
+@click.option('--match-mode',
+             type=click.Choice(MATCH_MODES),
+             default='token',
+             help='token: keywords match whole words, multi-word keywords match consecutive words; '
+                  'substring: a keyword matches any word containing it (previous behaviour) (default: token)')
+@click.option('-v', '--verbose',
+             count=True,
+             help='Print keyword matches (-v) or every keyword comparison (-vv)')
+@click.option('--serve',
+             is_flag=True,
+             help='Run as a server that keeps the model loaded and accepts split jobs over HTTP')
+@click.option('--host',
+             default=DEFAULT_HOST,
+             help=f'Address for --serve to listen on (default: {DEFAULT_HOST})')
+@click.option('--port',
+             type=int,
+             default=DEFAULT_PORT,
+             help=f'Port for --serve to listen on (default: {DEFAULT_PORT})')
+@click.option('--server',
+             help='Submit files to a running server instead of loading the model, '
+                  f'e.g. http://{DEFAULT_HOST}:{DEFAULT_PORT}')
+@click.option('--watch',
+             is_flag=True,
+             help='Keep running and process new files as they appear in the input directory')
+@click.option('--watch-interval',
+             type=click.FloatRange(min=0.1),
+             default=2.0,
+             help='Seconds between scans of the input directory in --watch mode (default: 2)')
+@click.option('--stable-seconds',
+             type=click.FloatRange(min=0.0),
+             default=5.0,
+             help='A new file must stay unchanged this long before it is processed (default: 5)')
+@click.option('--queue-file',
+             type=click.Path(dir_okay=False, path_type=Path),
+             help='SQLite work queue for --watch (default: .split_queue.sqlite3 in the output directory)')
+@click.option('--no-resume',
+             is_flag=True,
+             help='Ignore progress manifests of earlier runs and process every file from scratch')
+@click.option('--metrics-log',
+             type=click.Path(dir_okay=False, path_type=Path),
+             help='Append per-stage timings and per-file summaries to this JSON-lines file')
+@click.option('--prometheus-file',
+             type=click.Path(dir_okay=False, path_type=Path),
+             help='Write stage totals in Prometheus textfile format to this file')
+@click.option('--profile',
+             type=click.Path(dir_okay=False, path_type=Path),
+             help='Profile the run; writes cProfile stats, or pyinstrument HTML for a .html file')
+def main(ctx: click.Context, keyword: str, model: str, backend: str, language: str, 
          trim_remove_seconds: float, trim_before: bool, end_keyword: str,
          trim_end_keyword_remove_seconds: float, trim_end_keyword_before: bool,
-         input_dir: Optional[Path], output_dir: Optional[Path]):
+         input_dir: Optional[Path], output_dir: Optional[Path], recursive: bool,
+         no_cache: bool, cache_dir: Path, cache_max_size_mb: float,
+         cache_max_age_days: Optional[float], split_engine: str,
+         output_format: Optional[str], bitrate: Optional[str], export_workers: int,
+         stream: bool, stream_window: float, stream_overlap: float,
+         pipeline: bool, vad: bool, vad_threshold_db: float, vad_padding: float,
+         vad_min_silence: float, spot_model: Optional[str], spot_context: float,
+         batch_size: int, prefetch: int, prefetch_memory_mb: float, jobs: int,
+         threads_per_job: Optional[int],
+         match_mode: str, verbose: int, serve: bool, host: str, port: int,
+         server: Optional[str], watch: bool, watch_interval: float, stable_seconds: float,
+         queue_file: Optional[Path], no_resume: bool, metrics_log: Optional[Path],
+         prometheus_file: Optional[Path], profile: Optional[Path]):
     """Split audio files based on keyword occurrences."""
+    if ctx.invoked_subcommand:
+        return
+    
+    metrics = Metrics(log_file=metrics_log, prometheus_file=prometheus_file)
+    
+    def create_transcriber():
+        """Build the transcriber; whisper and torch are only imported from here on."""
+        from transcription import TranscriptionManager
+        from vad import VoiceActivityDetector
+        
+        cache = None
+        if not no_cache:
+            cache = TranscriptionCache(cache_dir, max_size_mb=cache_max_size_mb,
+                                       max_age_days=cache_max_age_days)
+        
+        detector = None
+        if vad:
+            detector = VoiceActivityDetector(threshold_db=vad_threshold_db, padding=vad_padding,
+                                             min_silence=vad_min_silence)
+        
+        if spot_model and pipeline:
+            print("[yellow]--pipeline has no effect with --spot-model[/yellow]")
+        return TranscriptionManager(model_name=model, language=language, cache=cache,
+                                    stream_window=stream_window if stream or pipeline else None,
+                                    stream_overlap=stream_overlap, metrics=metrics,
+                                    vad=detector, spot_model=spot_model,
+                                    spot_context=spot_context, batch_size=batch_size,
+                                    backend=backend)
+    
+    try:
+        with profile_to(profile), metrics.span("run"):
+            # Initialize components
+            config = Config()
+            
+            if serve:
+                from server import SplitServer
+                # Keywords and trim settings come with each job
+                SplitServer(create_transcriber(), split_engine=split_engine,
+                            export_workers=export_workers, match_mode=match_mode,
+                            verbosity=verbose, pipelined=pipeline,
+                            output_format=output_format, bitrate=bitrate).serve(host, port)
+                return
+            
+            keywords = config.get_keywords(keyword)
+            print(f"Using keywords: {', '.join(keywords)}")
+            processor = AudioProcessor(trim_seconds=trim_remove_seconds, trim_before=trim_before,
+                                       split_engine=create_split_engine(split_engine, output_format,
+                                                                        bitrate),
+                                       export_workers=export_workers,
+                                       match_mode=match_mode, verbosity=verbose,
+                                       metrics=metrics)
+            
+            # Get configured directories and ensure they exist
+            config_input_dir, config_output_dir = config.get_directories()
+            
+            # CLI options override config
+            if input_dir:
+                # Clean any trailing quotes from paths
+                input_dir = Path(str(input_dir).strip('"'))
+                config.save_directories(str(input_dir), str(config_output_dir))
+                config_input_dir = input_dir
+            if output_dir:
+                # Clean any trailing quotes from paths
+                output_dir = Path(str(output_dir).strip('"'))
+                config.save_directories(str(config_input_dir), str(output_dir))
+                config_output_dir = output_dir
+            
+            input_dir, output_dir = ensure_directories(config_input_dir, config_output_dir)
+            
+            end_keywords = [k.strip() for k in end_keyword.split(',')] if end_keyword else None
+            
+            def create_split_options():
+                from pipeline import SplitOptions
+                return SplitOptions(
+                    keywords=keywords,
+                    output_dir=output_dir,
+                    end_keywords=end_keywords,
+                    trim_end_keyword_seconds=trim_end_keyword_remove_seconds,
+                    trim_end_keyword_before=trim_end_keyword_before,
+                    resume=not no_resume
+                )
+            
+            if watch:
+                from watcher import run_watch
+                run_watch(input_dir, create_transcriber(), processor, create_split_options(),
+                          queue_file=queue_file or output_dir / ".split_queue.sqlite3",
+                          jobs=jobs, pipelined=pipeline, threads_per_job=threads_per_job,
+                          poll_interval=watch_interval, stable_seconds=stable_seconds)
+                return
+            
+            audio_files = get_audio_files(input_dir, recursive=recursive, exclude=output_dir)
+            
+            if not audio_files:
+                return
+            
+            if server:
+                def explicit(name: str) -> Optional[str]:
+                    # Options left at their default use the server's setting
+                    if ctx.get_parameter_source(name) == click.core.ParameterSource.DEFAULT:
+                        return None
+                    return ctx.params[name]
+                
+                if not server_available(server):
+                    raise click.ClickException(f"No split server answering at {server}")
+                for audio_file in track(audio_files, description="Submitting audio files"):
+                    print(f"\n[bold blue]Submitting {audio_file.name} to {server}...[/bold blue]")
+                    response = submit_job(
+                        server, audio_file, keywords, output_dir,
+                        end_keywords=end_keywords,
+                        trim_remove_seconds=trim_remove_seconds,
+                        trim_before=trim_before,
+                        trim_end_keyword_remove_seconds=trim_end_keyword_remove_seconds,
+                        trim_end_keyword_before=trim_end_keyword_before,
+                        split_engine=explicit('split_engine'),
+                        output_format=output_format,
+                        bitrate=bitrate,
+                        match_mode=explicit('match_mode')
+                    )
+                    print(f"Saved {len(response['metadata']['splits'])} part(s) to "
+                          f"{response['output_dir']} ({response['seconds']:.1f}s)")
+                print("\n[green]Processing complete![/green]")
+                return
+            
+            # Only now that there are files to transcribe are whisper and torch loaded
+            from pipeline import run_file
+            transcriber = create_transcriber()
+            split_options = create_split_options()
+            
+            if prefetch and (jobs > 1 or (transcriber.batched and not spot_model)):
+                print("[yellow]--prefetch has no effect with --jobs or --batch-size[/yellow]")
+            
+            if jobs > 1:
+                from batch import run_batch
+                run_batch(audio_files, jobs, transcriber, processor, split_options,
+                          pipelined=pipeline, threads_per_job=threads_per_job)
+                print("\n[green]Processing complete![/green]")
+                return
+            
+            if transcriber.batched and not spot_model:
+                from pipeline import run_batched
+                # Windows of consecutive files share batches; each file is split once transcribed
+                run_batched(audio_files, transcriber, processor, split_options)
+                print("\n[green]Processing complete![/green]")
+                return
+            
+            if prefetch:
+                from prefetch import prefetch_pcm
+                # The next files are decoded while the current one is transcribed
+                decoded = prefetch_pcm(audio_files, prefetch, prefetch_memory_mb, metrics)
+            else:
+                decoded = ((audio_file, None) for audio_file in audio_files)
+            for audio_file, audio in track(decoded, total=len(audio_files),
+                                           description="Processing audio files"):
+                print(f"\n[bold blue]Processing {audio_file.name}...[/bold blue]")
+                run_file(audio_file, transcriber, processor, split_options, pipelined=pipeline,
+                         audio=audio)
+            
+            print("\n[green]Processing complete![/green]")
+            
+    except Exception as e:
+        console.print_exception()
+        raise click.ClickException(str(e))
+    finally:
+        metrics.write_prometheus()
+
+@main.command()
+@click.option('--keyword', help='Keyword(s) to split on (comma-separated, overrides settings.ini)')
+@click.option('--trim-remove-seconds',
+             type=float,
+             default=2.0,
+             help='Number of seconds to remove when trimming (default: 2.0)')
+@click.option('--trim-before',
+             is_flag=True,
+             help='Remove seconds before the keyword instead of after')
+@click.option('--end-keyword',
+             help='Keyword(s) that mark the end of a segment (comma-separated)')
+@click.option('--trim-end-keyword-remove-seconds',
+             type=float,
+             default=2.0,
+             help='Number of seconds to remove when trimming around end-keyword (default: 2.0)')
+@click.option('--trim-end-keyword-before',
+             is_flag=True,
+             help='Remove seconds before the end-keyword instead of after')
+@click.option('--output-dir',
+             type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+             help='Output directory of earlier runs (default: output_dir from settings.ini)')
+@click.option('--split-engine',
+             type=click.Choice(list(SPLIT_ENGINES)),
+             default='pydub',
+             help='How parts are cut: pydub, ffmpeg-copy, ffmpeg, pcm or mmap (default: pydub)')
+@click.option('--output-format',
+             type=click.Choice(OUTPUT_FORMAT_CHOICES),
+             help='Format of the parts: mp3, ogg, opus, flac, wav, or source to stream-copy the '
+                  'source format (selects ffmpeg-copy) (default: mp3, source for ffmpeg-copy)')
+@click.option('--bitrate',
+             help='Bitrate of the parts, e.g. 128k; ignored for flac, wav and source '
+                  '(default: encoder default)')
+@click.option('--export-workers',
+             type=click.IntRange(min=1),
+             default=1,
+             help='Number of parts to encode concurrently (default: 1)')
+@click.option('--match-mode',
+             type=click.Choice(MATCH_MODES),
+             default='token',
+             help='token: keywords match whole words; substring: a keyword matches any word '
+                  'containing it (default: token)')
+@click.option('-v', '--verbose',
+             count=True,
+             help='Print keyword matches (-v) or every keyword comparison (-vv)')
+def resplit(keyword: str, trim_remove_seconds: float, trim_before: bool, end_keyword: str,
+            trim_end_keyword_remove_seconds: float, trim_end_keyword_before: bool,
+            output_dir: Optional[Path], split_engine: str, output_format: Optional[str],
+            bitrate: Optional[str], export_workers: int, match_mode: str, verbose: int):
+    """Split processed files again from their stored words, without transcribing."""
+    from resplit import resplit_directory
+    
     try:
-        # Initialize components
         config = Config()
         keywords = config.get_keywords(keyword)
         print(f"Using keywords: {', '.join(keywords)}")
-        
-        transcriber = TranscriptionManager(model_name=model, language=language)
-        processor = AudioProcessor(trim_seconds=trim_remove_seconds, trim_before=trim_before)
-        
-        # Get configured directories and ensure they exist
-        config_input_dir, config_output_dir = config.get_directories()
-        
-        # CLI options override config
-        if input_dir:
-            # Clean any trailing quotes from paths
-            input_dir = Path(str(input_dir).strip('"'))
-            config.save_directories(str(input_dir), str(config_output_dir))
-            config_input_dir = input_dir
         if output_dir:
-            # Clean any trailing quotes from paths
             output_dir = Path(str(output_dir).strip('"'))
-            config.save_directories(str(config_input_dir), str(output_dir))
-            config_output_dir = output_dir
-            
-        input_dir, output_dir = ensure_directories(config_input_dir, config_output_dir)
-        audio_files = get_audio_files(input_dir)
-        
-        if not audio_files:
-            return
-        
-        for audio_file in track(audio_files, description="Processing audio files"):
-            print(f"\n[bold blue]Processing {audio_file.name}...[/bold blue]")
-            
-            # Transcribe audio
-            transcription = transcriber.transcribe(audio_file)
-            
-            # Find keyword occurrences
-            keyword_occurrences = processor.find_keyword_occurrences(
-                transcription.words, keywords
-            )
-            
-            # Find end-keywords occurrences if specified
-            end_keyword_occurrences = None
-            if end_keyword:
-                end_keywords = [k.strip() for k in end_keyword.split(',')]
-                end_keyword_occurrences = processor.find_keyword_occurrences(
-                    transcription.words, end_keywords
-                )
-                if end_keyword_occurrences:
-                    print(f"Found {len(end_keyword_occurrences)} end-keyword occurrences")
-            
-            # Process audio and save splits
-            result = processor.process_audio(
-                audio_file, keywords, keyword_occurrences,
-                output_base_dir=output_dir,
-                end_keyword_occurrences=end_keyword_occurrences,
-                trim_end_keyword_seconds=trim_end_keyword_remove_seconds,
-                trim_end_keyword_before=trim_end_keyword_before
-            )
-            
-            # Save metadata
-            processor.save_metadata(
-                result.output_dir,
-                audio_file.stem,
-                result,
-                transcription.text,
-                transcription.language,
-                keywords,
-                end_keywords=end_keywords if end_keyword else None
-            )
-        
-        print("\n[green]Processing complete![/green]")
+        else:
+            _, output_dir = config.get_directories()
         
+        processor = AudioProcessor(trim_seconds=trim_remove_seconds, trim_before=trim_before,
+                                   split_engine=create_split_engine(split_engine, output_format,
+                                                                    bitrate),
+                                   export_workers=export_workers,
+                                   match_mode=match_mode, verbosity=verbose)
+        end_keywords = [k.strip() for k in end_keyword.split(',')] if end_keyword else None
+        count = resplit_directory(output_dir, processor, keywords, end_keywords=end_keywords,
+                                  trim_end_keyword_seconds=trim_end_keyword_remove_seconds,
+                                  trim_end_keyword_before=trim_end_keyword_before)
+        print(f"\n[green]Re-split {count} file(s)[/green]")
     except Exception as e:
         console.print_exception()
         raise click.ClickException(str(e))
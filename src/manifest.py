@@ -0,0 +1,196 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import json
+import os
+import tempfile
+import threading
+from rich import print
+from word_store import load_words, save_words, words_file
+
+# Bump when the stored layout changes so old manifests are ignored
+MANIFEST_VERSION = 1
+
+MANIFEST_NAME = ".manifest.json"
+
+# Split settings that change the content of a part with the same bounds
+ENCODING_SETTINGS = ("split_engine", "output_format", "bitrate")
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write data to path through a temporary file and rename, so readers never see a partial file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+class FileManifest:
+    """Progress of one input file, stored next to its parts in the output directory.
+
+    Records which stages have completed: transcribed (while a pipelined run
+    streams, the windows transcribed so far), matched, every exported part,
+    metadata written and original moved. Each update rewrites the
+    manifest atomically, so after a crash a new run can skip finished stages,
+    export only the missing parts and skip files that are already done.
+    Recorded progress is only reused for the same source file (name, size,
+    modification time). When the split settings change, only the
+    transcription and the parts with unchanged bounds and encoding are
+    kept; a transcription is reused as long as the transcription settings
+    match.
+    """
+
+    def __init__(self, output_dir: Path, source: dict, settings: dict, transcriber_settings: dict):
+        self.output_dir = output_dir
+        self.path = output_dir / MANIFEST_NAME
+        self.transcriber_settings = transcriber_settings
+        # The transcription is kept in the word sidecar next to the metadata
+        self.words_file = words_file(output_dir, Path(source["name"]).stem)
+        self.data = {"version": MANIFEST_VERSION, "source": source, "settings": settings, "stages": {}}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, output_dir: Path, input_file: Path, settings: dict, transcriber_settings: dict,
+             resume: bool = True) -> "FileManifest":
+        """Load the manifest for input_file, keeping only the progress that is still valid."""
+        stat = input_file.stat()
+        source = {"name": input_file.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        # Round-trip through JSON so settings compare equal to the stored ones
+        settings = json.loads(json.dumps(settings, default=str))
+        transcriber_settings = json.loads(json.dumps(transcriber_settings, default=str))
+        manifest = cls(output_dir, source, settings, transcriber_settings)
+        if not resume:
+            return manifest
+
+        try:
+            with open(manifest.path, encoding='utf-8') as f:
+                existing = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if existing.get("version") != MANIFEST_VERSION or existing.get("source") != source:
+            return manifest
+
+        stages = existing.get("stages", {})
+        if existing.get("settings") == settings:
+            manifest.data["stages"] = stages
+        else:
+            # Split settings changed: the transcription and duration are still valid, and so
+            # are exported parts as long as they are encoded the same way; each part is only
+            # reused if its file and bounds still match
+            kept = ["transcribed", "streamed", "loaded"]
+            old_settings = existing.get("settings") or {}
+            if all(old_settings.get(key) == settings.get(key) for key in ENCODING_SETTINGS):
+                kept.append("parts")
+            manifest.data["stages"] = {stage: stages[stage] for stage in kept if stage in stages}
+        if manifest.data["stages"] and not manifest.complete:
+            print(f"[yellow]Resuming {input_file.name}: "
+                  f"{', '.join(manifest.data['stages'])} already done[/yellow]")
+        return manifest
+
+    def _save(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, json.dumps(self.data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+    def mark(self, stage: str, **fields) -> None:
+        """Record that stage has completed."""
+        with self._lock:
+            self.data["stages"][stage] = fields
+            self._save()
+
+    def done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    @property
+    def complete(self) -> bool:
+        """Whether every stage, up to moving the original, has completed."""
+        return self.done("original_moved")
+
+    @property
+    def transcribed(self) -> bool:
+        """Whether a transcription made with the current transcription settings is stored."""
+        stage = self.data["stages"].get("transcribed")
+        return bool(stage) and stage.get("settings") == self.transcriber_settings
+
+    def load_transcription(self) -> Optional[dict]:
+        """Return the stored transcription if it was made with the current transcription settings."""
+        if not self.transcribed:
+            return None
+        try:
+            data = load_words(self.words_file)
+        except (OSError, ValueError, KeyError):
+            return None
+        del data["source"]
+        return data
+
+    def save_transcription(self, transcription: dict) -> None:
+        """Store the transcription so a restarted run does not transcribe the file again."""
+        if self.load_transcription() is not None:
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        save_words(self.words_file, transcription["text"], transcription["language"],
+                   transcription["segments"], source=self.data["source"]["name"])
+        # The complete transcription replaces the words of an interrupted stream
+        self.data["stages"].pop("streamed", None)
+        self.mark("transcribed", settings=self.transcriber_settings)
+
+    def save_stream_progress(self, transcription: dict, progress: dict) -> None:
+        """Store the words a streamed transcription produced so far, and where it stopped."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        save_words(self.words_file, transcription["text"], transcription["language"],
+                   transcription["segments"], source=self.data["source"]["name"])
+        self.mark("streamed", settings=self.transcriber_settings, progress=progress,
+                  words=len(transcription["words"]))
+
+    def load_stream_progress(self) -> Optional[Tuple[dict, dict]]:
+        """Return (progress, transcription so far) of an interrupted streamed transcription.
+
+        None if there is none for the current transcription settings.
+        """
+        stage = self.data["stages"].get("streamed")
+        if not stage or stage.get("settings") != self.transcriber_settings or self.transcribed:
+            return None
+        try:
+            data = load_words(self.words_file)
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(data["words"]) != stage["words"]:
+            # Interrupted between writing the words and recording them
+            return None
+        del data["source"]
+        return stage["progress"], data
+
+    @property
+    def audio_duration(self) -> Optional[float]:
+        return self.data["stages"].get("loaded", {}).get("duration")
+
+    def mark_matched(self, keyword_occurrences: List[dict],
+                     end_keyword_occurrences: Optional[List[dict]]) -> None:
+        self.mark("matched", keyword_occurrences=keyword_occurrences,
+                  end_keyword_occurrences=end_keyword_occurrences)
+
+    def exported_part(self, part: int, start_ms: int, end_ms: int, output_file: Path) -> Optional[float]:
+        """Encode time of a part exported earlier with the same bounds, or None if it must be exported."""
+        recorded = self.data["stages"].get("parts", {}).get(str(part))
+        if not recorded or (recorded["file"], recorded["start_ms"], recorded["end_ms"]) != \
+                (output_file.name, start_ms, end_ms):
+            return None
+        try:
+            if output_file.stat().st_size != recorded["bytes"]:
+                return None
+        except OSError:
+            return None
+        return recorded["encode_seconds"]
+
+    def mark_part(self, part: int, start_ms: int, end_ms: int, output_file: Path,
+                  encode_seconds: float) -> None:
+        with self._lock:
+            parts = self.data["stages"].setdefault("parts", {})
+            parts[str(part)] = {
+                "file": output_file.name,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "bytes": output_file.stat().st_size,
+                "encode_seconds": encode_seconds
+            }
+            self._save()
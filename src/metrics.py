@@ -0,0 +1,173 @@
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Metrics:
+    """Collects timed spans and counters for the pipeline.
+
+    Every span and event is appended as one JSON object per line to
+    log_file, and per-stage totals can be written as a Prometheus textfile.
+    Without any output configured the recorder only keeps in-memory totals,
+    so instrumented code does not need to check whether metrics are enabled.
+    """
+
+    def __init__(self, log_file: Optional[Path] = None, prometheus_file: Optional[Path] = None):
+        self.log_file = Path(log_file) if log_file else None
+        self.prometheus_file = Path(prometheus_file) if prometheus_file else None
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_count: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.log_file or self.prometheus_file)
+
+    def __getstate__(self):
+        # Locks cannot be pickled into worker processes
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict) -> None:
+        if not self.log_file:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock, open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    @contextmanager
+    def span(self, stage: str, file: Optional[Path] = None, **fields) -> Iterator[dict]:
+        """Time a pipeline stage. Fields added to the yielded dict are logged with the span."""
+        record = dict(fields)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+                self.stage_count[stage] = self.stage_count.get(stage, 0) + 1
+            self._write(dict(record, type="span", stage=stage,
+                             file=str(file) if file else None, seconds=round(seconds, 6),
+                             ts=time.time(), pid=os.getpid()))
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Increase a counter such as bytes_read or bytes_written."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        """Copy of the current totals, used to compute what a single file added."""
+        with self._lock:
+            return {
+                "stage_seconds": dict(self.stage_seconds),
+                "stage_count": dict(self.stage_count),
+                "counters": dict(self.counters)
+            }
+
+    def delta_since(self, snapshot: dict) -> dict:
+        """Totals accumulated since snapshot was taken."""
+        current = self.snapshot()
+        return {
+            key: {name: value - snapshot[key].get(name, 0) for name, value in current[key].items()}
+            for key in current
+        }
+
+    def merge(self, totals: dict) -> None:
+        """Add totals recorded by another process, e.g. a batch worker."""
+        with self._lock:
+            for key in ("stage_seconds", "stage_count", "counters"):
+                target = getattr(self, key)
+                for name, value in totals.get(key, {}).items():
+                    target[name] = target.get(name, 0) + value
+
+    def event(self, name: str, file: Optional[Path] = None, **fields) -> None:
+        """Log a one-off record, e.g. the summary of a processed file."""
+        self._write(dict(fields, type="event", event=name, file=str(file) if file else None,
+                         ts=time.time(), pid=os.getpid()))
+
+    def write_prometheus(self) -> None:
+        """Atomically write the totals in Prometheus textfile collector format."""
+        if not self.prometheus_file:
+            return
+        with self._lock:
+            lines = [
+                "# HELP split_stage_seconds_total Time spent in each pipeline stage.",
+                "# TYPE split_stage_seconds_total counter"
+            ]
+            lines += [f'split_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                      for stage, seconds in sorted(self.stage_seconds.items())]
+            lines += [
+                "# HELP split_stage_runs_total Number of times each pipeline stage ran.",
+                "# TYPE split_stage_runs_total counter"
+            ]
+            lines += [f'split_stage_runs_total{{stage="{stage}"}} {count}'
+                      for stage, count in sorted(self.stage_count.items())]
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE split_{name}_total counter", f"split_{name}_total {value:g}"]
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines += ["# TYPE split_peak_rss_bytes gauge", f"split_peak_rss_bytes {peak}"]
+
+        self.prometheus_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.prometheus_file.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_name, self.prometheus_file)
+
+@contextmanager
+def profile_to(output_file: Optional[Path]) -> Iterator[None]:
+    """Profile the enclosed block and dump the result to output_file.
+
+    A .html file is written with pyinstrument when it is installed, any
+    other name gets cProfile stats that can be opened with pstats or snakeviz.
+    """
+    if output_file is None:
+        yield
+        return
+
+    output_file = Path(output_file)
+    if output_file.suffix == ".html":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("pyinstrument is required for an .html profile, "
+                               "use a .prof file for cProfile instead")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            output_file.write_text(profiler.output_html(), encoding='utf-8')
+        return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(output_file))
@@ -0,0 +1,343 @@
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from rich import print
+import json
+import time
+import numpy as np
+
+from transcription import TranscriptionManager, TranscriptionResult, assemble_windows
+from audio_processor import AudioProcessor, ProcessingResult, SplitInfo
+from utils import format_time
+from keyword_matcher import KeywordMatcher
+from audio_io import probe_duration
+from metrics import peak_rss_bytes
+from manifest import FileManifest
+
+@dataclass
+class SplitOptions:
+    keywords: List[str]
+    output_dir: Path
+    end_keywords: Optional[List[str]] = None
+    trim_end_keyword_seconds: float = 2.0
+    trim_end_keyword_before: bool = False
+    # Continue from the progress manifest of an interrupted run
+    resume: bool = True
+
+def open_manifest(audio_file: Path, transcriber: TranscriptionManager, processor: AudioProcessor,
+                  options: SplitOptions) -> FileManifest:
+    """Open the progress manifest of audio_file in its output directory."""
+    settings = processor.split_settings(options.keywords, options.end_keywords,
+                                        options.trim_end_keyword_seconds,
+                                        options.trim_end_keyword_before)
+    transcriber_settings = transcriber.settings(options.keywords + (options.end_keywords or []))
+    return FileManifest.open(options.output_dir / audio_file.stem, audio_file, settings,
+                             transcriber_settings, resume=options.resume)
+
+def load_result(output_dir: Path, audio_file: Path) -> ProcessingResult:
+    """Rebuild the result of a completed file from its saved metadata."""
+    with open(output_dir / f"{audio_file.stem}_transcription.json", encoding='utf-8') as f:
+        metadata = json.load(f)
+    return ProcessingResult(
+        keyword_occurrences=metadata["keyword_occurrences"],
+        splits=[SplitInfo(**split) for split in metadata["splits"]],
+        output_dir=output_dir
+    )
+
+def run_file(audio_file: Path, transcriber: TranscriptionManager, processor: AudioProcessor,
+             options: SplitOptions, pipelined: bool = False,
+             transcription: Optional[TranscriptionResult] = None,
+             audio: Optional[np.ndarray] = None,
+             manifest: Optional[FileManifest] = None) -> ProcessingResult:
+    """Process one file and record its timing, real-time factor and I/O in the metrics.
+    
+    A transcription produced beforehand, e.g. by the batched engine, is split directly.
+    audio is the file's 16 kHz mono PCM if it was decoded ahead, e.g. by the prefetcher.
+    Files that a previous run completed with the same settings are skipped. manifest is
+    the file's progress manifest if the caller already opened it.
+    """
+    manifest = manifest or open_manifest(audio_file, transcriber, processor, options)
+    if manifest.complete:
+        print(f"[green]Skipping {audio_file.name}, already processed with these settings[/green]")
+        return load_result(manifest.output_dir, audio_file)
+    
+    metrics = processor.metrics
+    audio_seconds = None
+    if metrics.enabled:
+        try:
+            audio_seconds = probe_duration(audio_file)
+        except (RuntimeError, ValueError, OSError):
+            pass
+    bytes_read = audio_file.stat().st_size
+    written_before = metrics.counters.get("bytes_written", 0)
+    metrics.count("bytes_read", bytes_read)
+    if audio_seconds:
+        metrics.count("audio_seconds", audio_seconds)
+
+    # Keyword spotting transcribes whole candidate windows, it cannot be pipelined
+    process = process_file_pipelined if pipelined and not transcriber.spot_model else process_file
+    started = time.perf_counter()
+    with metrics.span("file", audio_file, pipelined=pipelined):
+        if transcription is not None:
+            result = split_transcription(audio_file, transcription, processor, options, manifest)
+        else:
+            result = process(audio_file, transcriber, processor, options, manifest, audio)
+    wall_seconds = time.perf_counter() - started
+
+    metrics.count("files")
+    metrics.event(
+        "file_summary", audio_file,
+        audio_seconds=audio_seconds,
+        wall_seconds=round(wall_seconds, 3),
+        real_time_factor=round(wall_seconds / audio_seconds, 4) if audio_seconds else None,
+        parts=len(result.splits),
+        bytes_read=bytes_read,
+        bytes_written=metrics.counters.get("bytes_written", 0) - written_before,
+        peak_rss_bytes=peak_rss_bytes()
+    )
+    metrics.write_prometheus()
+    return result
+
+def run_batched(audio_files: List[Path], transcriber: TranscriptionManager, processor: AudioProcessor,
+                options: SplitOptions) -> None:
+    """Transcribe files with the batched engine and split each one as soon as it is transcribed.
+
+    Files that a previous run completed, or whose manifest still holds a valid
+    transcription, are not queued for transcription; run_file skips or splits them.
+    """
+    manifests = {}
+
+    def needs_transcription(audio_file: Path) -> bool:
+        manifest = manifests[audio_file] = open_manifest(audio_file, transcriber, processor, options)
+        return not manifest.complete and not manifest.transcribed
+
+    for audio_file, transcription in transcriber.transcribe_batch(audio_files, needs_transcription):
+        print(f"\n[bold blue]Splitting {audio_file.name}...[/bold blue]")
+        run_file(audio_file, transcriber, processor, options, transcription=transcription,
+                 manifest=manifests.pop(audio_file))
+
+def process_file(audio_file: Path, transcriber: TranscriptionManager, processor: AudioProcessor,
+                 options: SplitOptions, manifest: Optional[FileManifest] = None,
+                 audio: Optional[np.ndarray] = None) -> ProcessingResult:
+    """Transcribe a file, split it at the keywords and save its metadata."""
+    transcription = _stored_transcription(manifest)
+    if transcription is None:
+        # Transcribe audio, reusing the splitter's decoded PCM if it has one
+        shared_audio = processor.split_engine.prepare(audio_file, audio)
+        transcription = transcriber.transcribe(audio_file, audio=shared_audio,
+                                               keywords=options.keywords + (options.end_keywords or []))
+    return split_transcription(audio_file, transcription, processor, options, manifest)
+
+def _stored_transcription(manifest: Optional[FileManifest]) -> Optional[TranscriptionResult]:
+    """Transcription saved by an interrupted run, if it is still valid."""
+    data = manifest.load_transcription() if manifest else None
+    if data is None:
+        return None
+    print("[green]Using the transcription of the interrupted run[/green]")
+    return TranscriptionResult(**data)
+
+def process_file_pipelined(audio_file: Path, transcriber: TranscriptionManager,
+                           processor: AudioProcessor, options: SplitOptions,
+                           manifest: Optional[FileManifest] = None,
+                           audio: Optional[np.ndarray] = None) -> ProcessingResult:
+    """Split a file while it is being transcribed.
+
+    Words are matched as the streaming transcriber produces them, and each
+    part is handed to the encoder as soon as its end-keyword is seen. Parts
+    without an end-keyword run to the end of the file and are exported once
+    transcription finishes. The resulting parts and metadata are identical
+    to process_file.
+
+    With a manifest, the words are stored after every window. A restarted
+    run matches the stored words again, keeps the parts that were already
+    exported and continues transcribing after the last stored window.
+    """
+    cached = _stored_transcription(manifest) or transcriber.load_cached(audio_file)
+    if cached is not None:
+        # Nothing to overlap with, split straight from the cached transcription
+        return split_transcription(audio_file, cached, processor, options, manifest)
+
+    output_dir = options.output_dir / audio_file.stem
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        shared_audio = processor.split_engine.prepare(audio_file, audio)
+        audio_duration = processor.split_engine.load(audio_file)
+        suffix = processor.split_engine.output_suffix(audio_file)
+
+        keyword_occurrences = []
+        end_keyword_occurrences = []
+        open_parts = []  # (part number, keyword occurrence) awaiting an end-keyword
+        pending = {}  # part number -> (plan, output file, future, or encode seconds of a kept part)
+        window_words = []
+        language = transcriber.language
+        stored = manifest.load_stream_progress() if manifest else None
+        progress = transcriber.stream_progress(stored[0] if stored else None)
+
+        def submit(pool: ThreadPoolExecutor, part: int, occ: dict, end_occurrences: List[dict]) -> None:
+            plan = processor.plan_split(
+                part, occ["start"], audio_duration,
+                end_keyword_occurrences=end_occurrences,
+                trim_end_keyword_seconds=options.trim_end_keyword_seconds,
+                trim_end_keyword_before=options.trim_end_keyword_before
+            )
+            output_file = output_dir / f"part_{part}{suffix}"
+            kept = manifest.exported_part(plan.part, plan.start_ms, plan.end_ms, output_file) if manifest else None
+            if kept is not None:
+                print(f"Keeping {output_file}, exported earlier")
+                pending[part] = (plan, output_file, kept)
+            else:
+                pending[part] = (plan, output_file, pool.submit(processor.export_part, plan, output_file, manifest))
+
+        matcher = KeywordMatcher(options.keywords, processor.match_mode, processor.verbosity)
+        end_matcher = None
+        if options.end_keywords:
+            end_matcher = KeywordMatcher(options.end_keywords, processor.match_mode, processor.verbosity)
+        events = []  # (start, is_start, occurrence) matched but not yet applied
+
+        def apply_events(pool: ThreadPoolExecutor, final: bool) -> None:
+            nonlocal open_parts
+            # Phrases can hold words back in a matcher; only apply events that
+            # start before anything still buffered so they are handled in time order
+            horizons = [m.horizon for m in (matcher, end_matcher) if m and m.horizon is not None]
+            limit = None if final or not horizons else min(horizons)
+            # End-keywords first at equal times, a word never closes the part it opens
+            events.sort(key=lambda event: (event[0], event[1]))
+            while events and (limit is None or events[0][0] < limit):
+                _, is_start, occ = events.pop(0)
+                if is_start:
+                    keyword_occurrences.append(occ)
+                    open_parts.append((len(keyword_occurrences), occ))
+                    print(f"- '{occ['matched_keyword']}' at {format_time(occ['start'])}")
+                else:
+                    end_keyword_occurrences.append(occ)
+                    still_open = []
+                    for part, start_occ in open_parts:
+                        if occ["start"] > start_occ["start"]:
+                            submit(pool, part, start_occ, [occ])
+                        else:
+                            still_open.append((part, start_occ))
+                    open_parts = still_open
+
+        def feed(pool: ThreadPoolExecutor, words: List[dict]) -> None:
+            for word in words:
+                if end_matcher:
+                    events.extend((occ["start"], False, occ) for occ in end_matcher.feed(word))
+                events.extend((occ["start"], True, occ) for occ in matcher.feed(word))
+            apply_events(pool, final=False)
+            window_words.append(words)
+
+        print("Transcribing and splitting audio...")
+        with ThreadPoolExecutor(max_workers=processor.export_workers) as pool:
+            if progress.windows:
+                print(f"[green]Continuing the interrupted run after {progress.windows} windows[/green]")
+                language = progress.language
+                for segment in stored[1]["segments"]:
+                    feed(pool, segment["words"])
+            for language, _, _, words in transcriber.stream_windows(audio_file, shared_audio, progress):
+                feed(pool, words)
+                if manifest:
+                    manifest.save_stream_progress(asdict(assemble_windows(language, window_words)),
+                                                  asdict(progress))
+
+            if end_matcher:
+                events.extend((occ["start"], False, occ) for occ in end_matcher.flush())
+            events.extend((occ["start"], True, occ) for occ in matcher.flush())
+            apply_events(pool, final=True)
+
+            # Remaining parts run to the end of the file
+            for part, occ in open_parts:
+                submit(pool, part, occ, None)
+
+            splits_info = []
+            for part in sorted(pending):
+                plan, output_file, export = pending[part]
+                splits_info.append(SplitInfo(
+                    part=plan.part,
+                    start_time=plan.start_time,
+                    end_time=plan.end_time,
+                    duration=(plan.end_ms - plan.start_ms) / 1000.0,
+                    file=output_file.name,
+                    encode_seconds=export.result() if isinstance(export, Future) else export
+                ))
+    finally:
+        # Release the engine's audio and any temporary file, also when an export failed
+        processor.split_engine.close()
+
+    print(f"Detected language: {language}")
+    transcription = assemble_windows(language, window_words)
+    transcriber.save_cached(audio_file, transcription)
+    if manifest:
+        manifest.save_transcription(asdict(transcription))
+        manifest.mark_matched(keyword_occurrences, end_keyword_occurrences)
+
+    if not keyword_occurrences:
+        print(f"No keyword occurrences found in {audio_file}")
+    elif end_keyword_occurrences:
+        print(f"Found {len(end_keyword_occurrences)} end-keyword occurrences")
+
+    result = processor.finish_processing(audio_file, output_dir, keyword_occurrences, splits_info,
+                                         move_original=False)
+    _finish(processor, audio_file, result, transcription, options, manifest)
+    return result
+
+def split_transcription(audio_file: Path, transcription: TranscriptionResult,
+                        processor: AudioProcessor, options: SplitOptions,
+                        manifest: Optional[FileManifest] = None) -> ProcessingResult:
+    """Match keywords in an existing transcription, split the file and save metadata."""
+    if manifest:
+        manifest.save_transcription(asdict(transcription))
+    
+    # Find keyword occurrences
+    keyword_occurrences = processor.find_keyword_occurrences(
+        transcription.words, options.keywords
+    )
+
+    # Find end-keywords occurrences if specified
+    end_keyword_occurrences = None
+    if options.end_keywords:
+        end_keyword_occurrences = processor.find_keyword_occurrences(
+            transcription.words, options.end_keywords
+        )
+        if end_keyword_occurrences:
+            print(f"Found {len(end_keyword_occurrences)} end-keyword occurrences")
+    if manifest:
+        manifest.mark_matched(keyword_occurrences, end_keyword_occurrences)
+
+    # Process audio and save splits
+    result = processor.process_audio(
+        audio_file, options.keywords, keyword_occurrences,
+        output_base_dir=options.output_dir,
+        end_keyword_occurrences=end_keyword_occurrences,
+        trim_end_keyword_seconds=options.trim_end_keyword_seconds,
+        trim_end_keyword_before=options.trim_end_keyword_before,
+        manifest=manifest,
+        move_original=False
+    )
+
+    _finish(processor, audio_file, result, transcription, options, manifest)
+    return result
+
+def _finish(processor: AudioProcessor, audio_file: Path, result: ProcessingResult,
+            transcription: TranscriptionResult, options: SplitOptions,
+            manifest: Optional[FileManifest]) -> None:
+    """Save the metadata, then move the original; a file is only gone from the input once it is done."""
+    _save_metadata(processor, audio_file, result, transcription, options)
+    if manifest:
+        manifest.mark("metadata")
+    processor.move_original(audio_file, result.output_dir)
+    if manifest:
+        manifest.mark("original_moved")
+
+def _save_metadata(processor: AudioProcessor, audio_file: Path, result: ProcessingResult,
+                   transcription: TranscriptionResult, options: SplitOptions) -> None:
+    processor.save_metadata(
+        result.output_dir,
+        audio_file.stem,
+        result,
+        transcription.text,
+        transcription.language,
+        options.keywords,
+        end_keywords=options.end_keywords
+    )
@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from rich import print
+
+from audio_io import SAMPLE_RATE, decode_pcm, probe_duration
+from metrics import Metrics
+
+# float32 mono
+BYTES_PER_SECOND = SAMPLE_RATE * 4
+
+def prefetch_pcm(audio_files: List[Path], depth: int, memory_budget_mb: float,
+                 metrics: Optional[Metrics] = None) -> Iterator[Tuple[Path, Optional[np.ndarray]]]:
+    """Yield (audio_file, pcm) in input order, decoding up to depth files ahead.
+
+    Each file is decoded to 16 kHz mono float32 by its own ffmpeg process,
+    driven from a background thread, while the caller works on the current
+    file. Decoded audio that is queued or being used by the caller never
+    exceeds memory_budget_mb, estimated from the probed duration. The
+    next file is only started once it fits. pcm is None for a file that
+    does not fit on its own or cannot be probed; the caller decodes it as
+    usual then.
+    """
+    metrics = metrics or Metrics()
+    budget = memory_budget_mb * 1024 * 1024
+    queued = deque()  # (audio_file, estimated bytes, future or None)
+    remaining = deque(audio_files)
+    reserved = 0  # estimated bytes of queued files and the file held by the caller
+    sizes = {}
+
+    def estimate(audio_file: Path) -> Optional[int]:
+        # Probed once, a file waiting for budget is checked again on every step
+        if audio_file not in sizes:
+            try:
+                sizes[audio_file] = int(probe_duration(audio_file) * BYTES_PER_SECOND)
+            except (RuntimeError, ValueError, OSError):
+                sizes[audio_file] = None
+        return sizes[audio_file]
+
+    def decode(audio_file: Path) -> np.ndarray:
+        with metrics.span("prefetch_decode", audio_file) as span:
+            samples = decode_pcm(audio_file)
+            span["bytes"] = samples.nbytes
+        return samples
+
+    pool = ThreadPoolExecutor(max_workers=depth)
+    try:
+        while remaining or queued:
+            # Top up the queue, the next file plus depth files ahead, while they fit in the budget
+            while remaining and len(queued) <= depth:
+                size = estimate(remaining[0])
+                if size is None or size > budget:
+                    if size is not None:
+                        print(f"[yellow]{remaining[0].name} needs ~{size / 1024 / 1024:.0f} MB decoded, "
+                              f"more than the prefetch budget; decoding it when it is processed[/yellow]")
+                    queued.append((remaining.popleft(), 0, None))
+                    continue
+                if reserved + size > budget:
+                    break
+                audio_file = remaining.popleft()
+                future: Future = pool.submit(decode, audio_file)
+                queued.append((audio_file, size, future))
+                reserved += size
+
+            audio_file, size, future = queued.popleft()
+            samples = None
+            if future is not None:
+                try:
+                    with metrics.span("prefetch_wait", audio_file):
+                        samples = future.result()
+                except (RuntimeError, OSError) as e:
+                    # Let the regular path decode it and report the error
+                    print(f"[yellow]Prefetching {audio_file.name} failed: {e}[/yellow]")
+            try:
+                yield audio_file, samples
+            finally:
+                # The caller is done with this file's audio
+                samples = None
+                reserved -= size
+    finally:
+        # Stopped early: drop decodes that have not started
+        pool.shutdown(wait=False, cancel_futures=True)
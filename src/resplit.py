@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import List, Optional
+from rich import print
+
+from audio_processor import AudioProcessor, ProcessingResult
+from manifest import FileManifest
+from word_store import WORDS_SUFFIX, load_words
+
+def find_word_files(output_dir: Path) -> List[Path]:
+    """Word sidecars of all processed files below output_dir."""
+    return sorted(output_dir.glob(f"*/*{WORDS_SUFFIX}"))
+
+def resplit_file(words_path: Path, processor: AudioProcessor, keywords: List[str],
+                 end_keywords: Optional[List[str]] = None,
+                 trim_end_keyword_seconds: float = 2.0,
+                 trim_end_keyword_before: bool = False) -> Optional[ProcessingResult]:
+    """Split a processed file again from its stored words, without transcribing it.
+
+    The original must still be in the file's output directory, where a normal
+    run moves it. Parts whose bounds did not change are kept, parts that no
+    longer exist are deleted. Returns None when the original is missing.
+    """
+    output_dir = words_path.parent
+    stored = load_words(words_path)
+    original = output_dir / stored["source"] if stored["source"] else None
+    if original is None or not original.exists():
+        print(f"[yellow]Skipping {output_dir.name}: original audio file not found[/yellow]")
+        return None
+
+    settings = processor.split_settings(keywords, end_keywords, trim_end_keyword_seconds,
+                                        trim_end_keyword_before)
+    # The transcription is not redone, so its settings are never compared
+    manifest = FileManifest.open(output_dir, original, settings, transcriber_settings={})
+
+    keyword_occurrences = processor.find_keyword_occurrences(stored["words"], keywords)
+    end_keyword_occurrences = None
+    if end_keywords:
+        end_keyword_occurrences = processor.find_keyword_occurrences(stored["words"], end_keywords)
+        if end_keyword_occurrences:
+            print(f"Found {len(end_keyword_occurrences)} end-keyword occurrences")
+    manifest.mark_matched(keyword_occurrences, end_keyword_occurrences)
+
+    result = processor.process_audio(
+        original, keywords, keyword_occurrences,
+        output_base_dir=output_dir.parent,
+        end_keyword_occurrences=end_keyword_occurrences,
+        trim_end_keyword_seconds=trim_end_keyword_seconds,
+        trim_end_keyword_before=trim_end_keyword_before,
+        manifest=manifest,
+        move_original=False
+    )
+
+    # Remove parts of the previous split that the new settings no longer produce
+    current = {split.file for split in result.splits} | {original.name}
+    for part_file in output_dir.glob("part_*"):
+        if part_file.name not in current:
+            part_file.unlink()
+            print(f"Removed {part_file}")
+
+    processor.save_metadata(result.output_dir, original.stem, result, stored["text"],
+                            stored["language"], keywords, end_keywords=end_keywords)
+    manifest.mark("metadata")
+    manifest.mark("original_moved")
+    return result
+
+def resplit_directory(output_dir: Path, processor: AudioProcessor, keywords: List[str],
+                      end_keywords: Optional[List[str]] = None,
+                      trim_end_keyword_seconds: float = 2.0,
+                      trim_end_keyword_before: bool = False) -> int:
+    """Split every processed file below output_dir again and return how many were split."""
+    word_files = find_word_files(output_dir)
+    if not word_files:
+        print(f"No word files (*{WORDS_SUFFIX}) found below {output_dir}")
+        return 0
+
+    count = 0
+    for words_path in word_files:
+        print(f"\n[bold blue]Re-splitting {words_path.parent.name}...[/bold blue]")
+        if resplit_file(words_path, processor, keywords, end_keywords,
+                        trim_end_keyword_seconds, trim_end_keyword_before) is not None:
+            count += 1
+    return count
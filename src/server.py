@@ -0,0 +1,173 @@
+from pathlib import Path
+from typing import List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import threading
+import time
+from rich import print
+
+from transcription import TranscriptionManager
+from audio_processor import AudioProcessor
+from split_engines import create_split_engine
+from pipeline import SplitOptions, run_file
+from client import DEFAULT_HOST, DEFAULT_PORT
+
+class JobError(Exception):
+    """Invalid job request, reported to the client as HTTP 400."""
+
+def keyword_list(value, field: str) -> List[str]:
+    """Keywords of a job field: a list of strings or a comma-separated string like --keyword."""
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(keyword, str) for keyword in value):
+        raise JobError(f"'{field}' must be a list of strings or a comma-separated string")
+    return [keyword.strip() for keyword in value if keyword.strip()]
+
+def job_flag(job: dict, field: str, default: bool) -> bool:
+    """A JSON true/false job field; strings like "false" are rejected instead of counting as true."""
+    value = job.get(field, default)
+    if not isinstance(value, bool):
+        raise JobError(f"'{field}' must be true or false")
+    return value
+
+def job_seconds(job: dict, field: str, default: float) -> float:
+    """A job field holding a number of seconds."""
+    value = job.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise JobError(f"'{field}' must be a number of seconds")
+    return float(value)
+
+class SplitServer:
+    """Keeps a TranscriptionManager warm and runs split jobs submitted over HTTP.
+
+    Jobs run one at a time because the Whisper model is shared; the HTTP
+    server still accepts connections while a job is running.
+    """
+
+    def __init__(self, transcriber: TranscriptionManager, split_engine: str = "pydub",
+                 export_workers: int = 1, match_mode: str = "token", verbosity: int = 0,
+                 pipelined: bool = False, output_format: Optional[str] = None,
+                 bitrate: Optional[str] = None):
+        self.transcriber = transcriber
+        self.split_engine = split_engine
+        self.output_format = output_format
+        self.bitrate = bitrate
+        self.export_workers = export_workers
+        self.match_mode = match_mode
+        self.verbosity = verbosity
+        self.pipelined = pipelined
+        self.lock = threading.Lock()
+        self.jobs_done = 0
+
+    def run_job(self, job: dict) -> dict:
+        """Process one file described by a job dict and return its metadata."""
+        try:
+            audio_file = Path(job["file"])
+            keywords = keyword_list(job["keywords"], "keywords")
+            output_dir = Path(job["output_dir"])
+        except (KeyError, TypeError) as e:
+            raise JobError(f"Job requires 'file', 'keywords' and 'output_dir' ({e})")
+        if not keywords:
+            raise JobError("'keywords' must contain at least one keyword")
+        end_keywords = keyword_list(job.get("end_keywords") or [], "end_keywords") or None
+        if not audio_file.is_file():
+            raise JobError(f"Audio file not found: {audio_file}")
+        try:
+            split_engine = create_split_engine(job.get("split_engine", self.split_engine),
+                                               output_format=job.get("output_format", self.output_format),
+                                               bitrate=job.get("bitrate", self.bitrate))
+        except ValueError as e:
+            raise JobError(str(e))
+
+        processor = AudioProcessor(
+            trim_seconds=job_seconds(job, "trim_remove_seconds", 2.0),
+            trim_before=job_flag(job, "trim_before", False),
+            split_engine=split_engine,
+            export_workers=self.export_workers,
+            match_mode=job.get("match_mode", self.match_mode),
+            verbosity=self.verbosity,
+            metrics=self.transcriber.metrics
+        )
+        options = SplitOptions(
+            keywords=keywords,
+            output_dir=output_dir,
+            end_keywords=end_keywords,
+            trim_end_keyword_seconds=job_seconds(job, "trim_end_keyword_remove_seconds", 2.0),
+            trim_end_keyword_before=job_flag(job, "trim_end_keyword_before", False),
+            resume=job_flag(job, "resume", True)
+        )
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        with self.lock:
+            print(f"\n[bold blue]Processing {audio_file.name}...[/bold blue]")
+            result = run_file(audio_file, self.transcriber, processor, options, self.pipelined)
+            self.jobs_done += 1
+
+        metadata_file = result.output_dir / f"{audio_file.stem}_transcription.json"
+        with open(metadata_file, encoding='utf-8') as f:
+            metadata = json.load(f)
+        return {
+            "status": "done",
+            "file": str(audio_file),
+            "output_dir": str(result.output_dir),
+            "seconds": time.perf_counter() - started,
+            "metadata": metadata
+        }
+
+    def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        """Load the model and serve jobs until interrupted."""
+        # Load the model now so the first job does not pay for it
+        if not self.transcriber.model:
+            self.transcriber.initialize_model()
+        httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        print(f"[green]Listening on http://{host}:{port}[/green]")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("Shutting down server")
+        finally:
+            httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, data: dict) -> None:
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, {
+                        "status": "ok",
+                        "model": server.transcriber.model_name,
+                        "jobs_done": server.jobs_done,
+                        "busy": server.lock.locked()
+                    })
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/jobs":
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    job = json.loads(self.rfile.read(length) or b"{}")
+                    self._send_json(200, server.run_job(job))
+                except (JobError, ValueError) as e:
+                    self._send_json(400, {"status": "failed", "error": str(e)})
+                except Exception as e:
+                    self._send_json(500, {"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+            def log_message(self, format, *args):
+                # Job progress is already printed, skip per-request access logs
+                pass
+
+        return Handler
@@ -0,0 +1,249 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import os
+import tempfile
+import numpy as np
+from audio_io import (OUTPUT_FORMATS, SAMPLE_RATE, cut_copy, decode_pcm, decode_raw, encode_frames,
+                      encode_parts, encode_pcm, encoder_args, probe_duration, probe_format)
+
+# Output format that keeps the source codec and container by stream copy
+SOURCE_FORMAT = "source"
+
+class SplitEngine:
+    """Backend that loads an input file and writes the individual parts."""
+
+    name = ""
+    # Output formats the engine can write, the first one is its default
+    formats: Tuple[str, ...] = tuple(OUTPUT_FORMATS)
+    # Whether export_many writes all parts in one go instead of part by part
+    exports_together = False
+
+    def __init__(self, output_format: Optional[str] = None, bitrate: Optional[str] = None):
+        self.output_format = output_format or self.formats[0]
+        if self.output_format not in self.formats:
+            raise ValueError(f"The {self.name} split engine cannot write '{self.output_format}'. "
+                             f"Available: {', '.join(self.formats)}")
+        self.bitrate = bitrate
+
+    def prepare(self, input_file: Path, samples: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Called before transcription; may return 16 kHz mono PCM to hand to Whisper.
+
+        samples is the 16 kHz mono PCM of input_file if it was decoded already.
+        """
+        return samples
+
+    def load(self, input_file: Path) -> float:
+        """Load the input file for splitting and return its duration in seconds."""
+        raise NotImplementedError
+
+    def output_suffix(self, input_file: Path) -> str:
+        """File extension used for the exported parts."""
+        return OUTPUT_FORMATS[self.output_format][0]
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        """Write the [start_ms, end_ms) range of the loaded input to output_file."""
+        raise NotImplementedError
+
+    def export_many(self, parts: List[Tuple[int, int, Path]]) -> None:
+        """Write several (start_ms, end_ms, output_file) ranges of the loaded input."""
+        for start_ms, end_ms, output_file in parts:
+            self.export(start_ms, end_ms, output_file)
+
+    def close(self) -> None:
+        """Release any audio held for the current input file."""
+        pass
+
+class PydubSplitEngine(SplitEngine):
+    """Decode the input into a pydub AudioSegment and re-encode each slice."""
+
+    name = "pydub"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.audio = None
+
+    def load(self, input_file: Path) -> float:
+        # pydub is imported on first use so the command line starts quickly
+        from pydub import AudioSegment
+        self.audio = AudioSegment.from_file(input_file)
+        return len(self.audio) / 1000.0
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        self.audio[start_ms:end_ms].export(
+            output_file, format=self.output_format,
+            parameters=encoder_args(self.output_format, self.bitrate, self.audio.frame_rate)
+        )
+
+    def close(self) -> None:
+        self.audio = None
+
+class FfmpegCopySplitEngine(SplitEngine):
+    """Cut parts directly from the source with ffmpeg stream copy.
+
+    Nothing is decoded or re-encoded, so parts keep the source codec and
+    container, and cut points snap to the nearest compressed frame.
+    """
+
+    name = "ffmpeg-copy"
+    formats = (SOURCE_FORMAT,)
+    exports_together = True
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.input_file = None
+
+    def load(self, input_file: Path) -> float:
+        self.input_file = input_file
+        return probe_duration(input_file)
+
+    def output_suffix(self, input_file: Path) -> str:
+        return input_file.suffix.lower()
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        cut_copy(self.input_file, start_ms / 1000.0, end_ms / 1000.0, output_file)
+
+    def export_many(self, parts: List[Tuple[int, int, Path]]) -> None:
+        # One pass over the source for all parts
+        encode_parts(self.input_file, [(start_ms / 1000.0, end_ms / 1000.0, output_file)
+                                       for start_ms, end_ms, output_file in parts],
+                     ["-c", "copy"])
+
+    def close(self) -> None:
+        self.input_file = None
+
+class FfmpegSplitEngine(SplitEngine):
+    """Re-encode parts straight from the source with ffmpeg, all parts of a file in one run.
+
+    ffmpeg decodes the source once and writes every part as its own output,
+    so a file costs one process however many keywords it has. Parts keep
+    the source sample rate and channels.
+    """
+
+    name = "ffmpeg"
+    exports_together = True
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.input_file = None
+        self.sample_rate = None
+
+    def load(self, input_file: Path) -> float:
+        self.input_file = input_file
+        self.sample_rate, _ = probe_format(input_file)
+        return probe_duration(input_file)
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        self.export_many([(start_ms, end_ms, output_file)])
+
+    def export_many(self, parts: List[Tuple[int, int, Path]]) -> None:
+        encode_parts(self.input_file, [(start_ms / 1000.0, end_ms / 1000.0, output_file)
+                                       for start_ms, end_ms, output_file in parts],
+                     encoder_args(self.output_format, self.bitrate, self.sample_rate))
+
+    def close(self) -> None:
+        self.input_file = None
+
+class PcmSplitEngine(SplitEngine):
+    """Decode once to 16 kHz mono PCM and share the buffer with Whisper.
+
+    The parts are encoded from the same buffer Whisper transcribed, so the
+    file is decoded a single time. Parts are written as 16 kHz mono.
+    """
+
+    name = "pcm"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.input_file = None
+        self.samples = None
+
+    def prepare(self, input_file: Path, samples: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        self.input_file = input_file
+        self.samples = samples if samples is not None else decode_pcm(input_file, SAMPLE_RATE)
+        return self.samples
+
+    def load(self, input_file: Path) -> float:
+        if self.samples is None or self.input_file != input_file:
+            self.prepare(input_file)
+        return len(self.samples) / SAMPLE_RATE
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        start = max(start_ms * SAMPLE_RATE // 1000, 0)
+        end = max(end_ms * SAMPLE_RATE // 1000, start)
+        encode_pcm(self.samples[start:end], SAMPLE_RATE, output_file,
+                   encoder_args(self.output_format, self.bitrate, SAMPLE_RATE))
+
+    def close(self) -> None:
+        self.input_file = None
+        self.samples = None
+
+class MmapSplitEngine(SplitEngine):
+    """Decode once to a raw PCM file on local disk and encode parts from a memory map of it.
+
+    The file keeps the source sample rate and channels as 16-bit PCM. Parts
+    are views into the map that are streamed to the encoder in chunks, so
+    resident memory stays roughly constant however long the input is. The
+    raw file is written to the temporary directory (TMPDIR) and deleted on
+    close.
+    """
+
+    name = "mmap"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.raw_file = None
+        self.frames = None
+        self.sample_rate = None
+
+    def load(self, input_file: Path) -> float:
+        self.close()
+        self.sample_rate, channels = probe_format(input_file)
+        fd, raw_name = tempfile.mkstemp(prefix=f"{input_file.stem}.", suffix=".pcm")
+        os.close(fd)
+        self.raw_file = Path(raw_name)
+        try:
+            decode_raw(input_file, self.raw_file, self.sample_rate, channels)
+        except BaseException:
+            self.close()
+            raise
+        if self.raw_file.stat().st_size:
+            self.frames = np.memmap(self.raw_file, dtype=np.int16, mode='r').reshape(-1, channels)
+        else:
+            self.frames = np.zeros((0, channels), np.int16)
+        return len(self.frames) / self.sample_rate
+
+    def export(self, start_ms: int, end_ms: int, output_file: Path) -> None:
+        start = max(start_ms * self.sample_rate // 1000, 0)
+        end = max(end_ms * self.sample_rate // 1000, start)
+        encode_frames(self.frames[start:end], self.sample_rate, output_file,
+                      encoder_args(self.output_format, self.bitrate, self.sample_rate))
+
+    def close(self) -> None:
+        # Drop the map before deleting the file it is backed by
+        self.frames = None
+        if self.raw_file is not None:
+            self.raw_file.unlink(missing_ok=True)
+            self.raw_file = None
+
+SPLIT_ENGINES = {
+    engine.name: engine
+    for engine in (PydubSplitEngine, FfmpegCopySplitEngine, FfmpegSplitEngine, PcmSplitEngine,
+                   MmapSplitEngine)
+}
+
+OUTPUT_FORMAT_CHOICES = list(OUTPUT_FORMATS) + [SOURCE_FORMAT]
+
+def create_split_engine(name: str, output_format: Optional[str] = None,
+                        bitrate: Optional[str] = None) -> SplitEngine:
+    """Instantiate the split engine registered under name, writing output_format at bitrate.
+
+    Without output_format the engine writes its default format. The source
+    format can only be written by stream copy, so it selects ffmpeg-copy.
+    """
+    if output_format == SOURCE_FORMAT:
+        name = FfmpegCopySplitEngine.name
+    try:
+        engine_class = SPLIT_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown split engine '{name}'. Available: {', '.join(SPLIT_ENGINES)}")
+    return engine_class(output_format=output_format, bitrate=bitrate)
@@ -1,9 +1,21 @@
 from pathlib import Path
 import torch
 import whisper
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, log_mel_spectrogram, pad_or_trim
+from whisper.timing import add_word_timestamps
+from whisper.tokenizer import get_tokenizer
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+import numpy as np
+from dataclasses import dataclass, asdict, field
 from rich import print
+from cache import TranscriptionCache
+from audio_io import SAMPLE_RATE, decode_pcm, stream_pcm
+from metrics import Metrics
+from vad import VoiceActivityDetector, SpeechTimeline
+from backends import TranscriptionBackend, create_backend
+from keyword_spotting import CandidateFinder, candidate_windows, merge_segments
+from utils import clean_text
 
 @dataclass
 class TranscriptionResult:
@@ -12,48 +24,601 @@ class TranscriptionResult:
     segments: list
     words: list
 
+# Seconds per Whisper timestamp token
+TIME_PRECISION = 0.02
+
+@dataclass
+class StreamProgress:
+    """How far stream_windows got, so an interrupted streamed transcription can continue."""
+    window: int  # Window and overlap in samples, progress only applies to the same layout
+    overlap: int
+    windows: int = 0  # Windows transcribed so far
+    language: Optional[str] = None
+    merger: Optional[dict] = None  # WindowMerger state after the last transcribed window
+
+@dataclass
+class _BatchedFile:
+    """Progress of one file in the batched engine."""
+    audio_file: Path
+    language: Optional[str]
+    merger: "WindowMerger"
+    windows: int = 0  # Windows cut so far
+    window_words: List[List[dict]] = field(default_factory=list)
+    all_cut: bool = False
+    result: Optional[TranscriptionResult] = None
+    skipped: bool = False  # Not transcribed, yielded with None
+
+@dataclass
+class _BatchWindow:
+    file: _BatchedFile
+    start: float
+    end: float
+    is_last: bool
+    mel: Optional[torch.Tensor]  # None for windows without speech
+    num_frames: int
+
+def _token_segments(tokens: List[int], tokenizer, duration: float) -> List[dict]:
+    """Split the tokens decoded for one window into segments at pairs of timestamp tokens.
+    
+    Unlike whisper.transcribe the window is not re-decoded from its last
+    timestamp, so trailing tokens without a closing timestamp form a
+    segment that runs to the end of the window.
+    """
+    begin = tokenizer.timestamp_begin
+    cuts = [i for i in range(1, len(tokens)) if tokens[i - 1] >= begin and tokens[i] >= begin]
+    segments = []
+    for first, last in zip([0] + cuts, cuts + [len(tokens)]):
+        sliced = tokens[first:last]
+        text_tokens = [token for token in sliced if token < tokenizer.eot]
+        if not text_tokens:
+            continue
+        start = (sliced[0] - begin) * TIME_PRECISION if sliced[0] >= begin else (
+            segments[-1]["end"] if segments else 0.0)
+        end = (sliced[-1] - begin) * TIME_PRECISION if sliced[-1] >= begin else duration
+        segments.append({
+            "seek": 0,
+            "start": start,
+            "end": max(start, end),
+            "text": tokenizer.decode(text_tokens),
+            "tokens": sliced
+        })
+    return segments
+
+class WindowMerger:
+    """Joins the words of consecutive overlapping windows of one recording.
+    
+    Each window only contributes words that start before the middle of its
+    trailing overlap; the next window contributes the words after that
+    seam. The two windows can place a word close to the seam on opposite
+    sides of it, and usually shift its timestamps by a few tenths of a
+    second, so near the seam a word of the next window is only dropped if
+    the previous window emitted the same word within SEAM_TOLERANCE.
+    
+    At a seam of 27.5 s, a word the second window places just before the
+    seam is kept, and a shifted repeat of a word already emitted is dropped:
+    
+    >>> merger = WindowMerger(overlap=5.0)
+    >>> [w["word"] for w in merger.merge([{"words": [
+    ...     {"word": " go", "start": 27.2, "end": 27.4},
+    ...     {"word": " chapter", "start": 27.52, "end": 27.9}]}], 0.0, 30.0, False)]
+    [' go']
+    >>> [w["word"] for w in merger.merge([{"words": [
+    ...     {"word": " go", "start": 2.32, "end": 2.5},
+    ...     {"word": " chapter", "start": 2.48, "end": 2.9}]}], 25.0, 55.0, True)]
+    [' chapter']
+    """
+    
+    SEAM_TOLERANCE = 0.5
+    
+    def __init__(self, overlap: float):
+        self.overlap = overlap
+        self.committed_until = 0.0  # Seam of the previous window
+        self.seam_words: List[Tuple[str, float]] = []  # (clean text, start) emitted near that seam
+        self.last_start = float("-inf")  # Start of the last emitted word
+    
+    def merge(self, segments: List[dict], window_start: float, window_end: float,
+              is_last: bool) -> List[dict]:
+        """Return the words of a window's segments that belong to it, with absolute timestamps."""
+        seam = window_end if is_last else window_end - self.overlap / 2
+        tolerance = self.SEAM_TOLERANCE
+        words = []
+        for segment in segments:
+            for word in segment["words"]:
+                word = dict(word, start=word["start"] + window_start, end=word["end"] + window_start)
+                if word["start"] >= seam:
+                    # Left to the next window
+                    continue
+                if word["start"] < self.committed_until - tolerance:
+                    # Well inside the part the previous window covered
+                    continue
+                if word["start"] < self.committed_until + tolerance:
+                    text = clean_text(word["word"])
+                    if word["start"] < self.last_start or any(
+                            text == seen and abs(word["start"] - start) <= tolerance
+                            for seen, start in self.seam_words):
+                        # Same word already emitted by the previous window
+                        continue
+                words.append(word)
+                self.last_start = word["start"]
+        self.committed_until = seam
+        self.seam_words = [(clean_text(word["word"]), word["start"]) for word in words
+                           if word["start"] >= seam - 2 * tolerance]
+        return words
+    
+    def state(self) -> dict:
+        """What merge needs to continue with the next window, as JSON-compatible values."""
+        return {"committed_until": self.committed_until,
+                "seam_words": [list(seam_word) for seam_word in self.seam_words],
+                "last_start": None if self.last_start == float("-inf") else self.last_start}
+    
+    def restore(self, state: dict) -> None:
+        """Continue after the window that state was taken at."""
+        self.committed_until = state["committed_until"]
+        self.seam_words = [tuple(seam_word) for seam_word in state["seam_words"]]
+        self.last_start = float("-inf") if state["last_start"] is None else state["last_start"]
+
+def assemble_windows(language: Optional[str], window_words: Iterable[List[dict]]) -> TranscriptionResult:
+    """Build a TranscriptionResult with one segment per window that has words."""
+    segments = []
+    for words in window_words:
+        if not words:
+            continue
+        segments.append({
+            "id": len(segments),
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": "".join(word["word"] for word in words),
+            "words": words
+        })
+    return TranscriptionResult(
+        text="".join(segment["text"] for segment in segments),
+        language=language,
+        segments=segments,
+        words=[word for segment in segments for word in segment["words"]]
+    )
+
 class TranscriptionManager:
-    def __init__(self, model_name: str = "base", language: Optional[str] = None):
+    def __init__(self, model_name: str = "base", language: Optional[str] = None,
+                 cache: Optional[TranscriptionCache] = None,
+                 stream_window: Optional[float] = None, stream_overlap: float = 5.0,
+                 metrics: Optional[Metrics] = None,
+                 vad: Optional[VoiceActivityDetector] = None,
+                 spot_model: Optional[str] = None, spot_context: float = 3.0,
+                 batch_size: int = 1, backend: str = "whisper"):
         self.model_name = model_name
         self.language = language
+        self.cache = cache
+        # Streaming is enabled when a window length is set
+        self.stream_window = stream_window
+        self.stream_overlap = stream_overlap
+        self.metrics = metrics or Metrics()
+        # Only speech regions are transcribed when a detector is set
+        self.vad = vad
+        # Keyword spotting: a small model finds candidates, this model confirms them
+        self.spot_model = spot_model
+        self.spot_context = spot_context
+        self._spotter = None
+        # Number of 30 s windows decoded together by the batched engine
+        self.batch_size = batch_size
+        self.backend: TranscriptionBackend = create_backend(backend)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = None
+        self._hash_id = None
+        self._audio_hash = None
     
     def initialize_model(self) -> None:
         """Initialize the Whisper model."""
+        if self.device not in self.backend.devices:
+            print(f"[yellow]The {self.backend.name} backend runs on CPU only[/yellow]")
+            self.device = "cpu"
         if self.device == "cuda":
             print(f"[green]Using CUDA with {torch.cuda.get_device_name(0)}[/green]")
         else:
             print("[yellow]CUDA not available, using CPU[/yellow]")
         
-        print(f"Loading whisper model '{self.model_name}'...")
-        self.model = whisper.load_model(self.model_name).to(self.device)
+        print(f"Loading whisper model '{self.model_name}' ({self.backend.name} backend)...")
+        with self.metrics.span("model_load", model=self.model_name, device=self.device,
+                               backend=self.backend.name):
+            self.model = self.backend.load(self.model_name, self.device)
     
-    def transcribe(self, audio_file: Path) -> TranscriptionResult:
-        """Transcribe audio file using Whisper."""
-        if not self.model:
-            self.initialize_model()
-        
-        # Prepare transcription options
+    def _options(self, language: Optional[str] = None, verbose: bool = True) -> Dict[str, Any]:
+        """Whisper transcription options shared by all modes."""
         options = {
             'word_timestamps': True,
-            'verbose': True,
+            'verbose': verbose,
             'condition_on_previous_text': False
         }
+        language = language or self.language
+        if language:
+            options['language'] = language
+        return options
+    
+    def transcribe(self, audio_file: Path, audio: Optional[np.ndarray] = None,
+                   keywords: Optional[List[str]] = None) -> TranscriptionResult:
+        """Transcribe audio file using Whisper, reusing a cached result when available.
+        
+        If audio is given it must be the already decoded 16 kHz mono PCM of
+        audio_file, and Whisper uses it instead of decoding the file again.
+        With keyword spotting enabled and keywords given, only the windows
+        around keyword candidates are transcribed with this model.
+        """
+        if self.spot_model and keywords:
+            return self.transcribe_spotted(audio_file, keywords, audio)
+        if self.batched:
+            _, transcription = next(self._transcribe_batched([(audio_file, audio)]))
+            return transcription
         
+        # Prepare transcription options
+        options = self._options()
         if self.language:
-            options['language'] = self.language
             print(f"Using language: {self.language}")
         
-        # Transcribe audio
-        print("Transcribing audio...")
-        result = self.model.transcribe(str(audio_file), **options)
-        print(f"Detected language: {result['language']}")
-        
-        return TranscriptionResult(
-            text=result["text"],
-            language=result["language"],
-            segments=result["segments"],
-            words=[word for segment in result["segments"] 
-                  for word in segment["words"]]
+        cached = self.load_cached(audio_file)
+        if cached is not None:
+            return cached
+        
+        if not self.model:
+            self.initialize_model()
+        
+        with self.metrics.span("transcribe", audio_file, model=self.model_name,
+                               streamed=bool(self.stream_window)) as span:
+            if self.stream_window:
+                transcription = self._transcribe_streamed(audio_file, audio)
+            else:
+                # Transcribe audio
+                print("Transcribing audio...")
+                result = self._run_model(audio if audio is not None else str(audio_file), options)
+                print(f"Detected language: {result['language']}")
+                
+                transcription = TranscriptionResult(
+                    text=result["text"],
+                    language=result["language"],
+                    segments=result["segments"],
+                    words=[word for segment in result["segments"] 
+                          for word in segment["words"]]
+                )
+            span["words"] = len(transcription.words)
+        
+        self.save_cached(audio_file, transcription)
+        
+        return transcription
+    
+    def transcribe_spotted(self, audio_file: Path, keywords: List[str],
+                           audio: Optional[np.ndarray] = None) -> TranscriptionResult:
+        """Transcribe with spot_model and confirm keyword candidates with this model.
+        
+        The result has the rough transcript outside the candidate windows and
+        this model's words inside them, so keyword occurrences and their
+        timestamps come from this model.
+        """
+        cached = self.load_cached(audio_file, keywords)
+        if cached is not None:
+            return cached
+        
+        if self._spotter is None:
+            self._spotter = TranscriptionManager(
+                model_name=self.spot_model, language=self.language, cache=self.cache,
+                stream_window=self.stream_window, stream_overlap=self.stream_overlap,
+                metrics=self.metrics, vad=self.vad, backend=self.backend.name
+            )
+        print(f"Spotting keywords with the '{self.spot_model}' model...")
+        coarse = self._spotter.transcribe(audio_file, audio)
+        
+        with self.metrics.span("spot_candidates", audio_file) as span:
+            candidates = CandidateFinder(keywords).find(coarse.words)
+            span["candidates"] = len(candidates)
+        if not candidates:
+            print("No keyword candidates found")
+            self.save_cached(audio_file, coarse, keywords)
+            return coarse
+        
+        if audio is None:
+            audio = decode_pcm(audio_file)
+        windows = candidate_windows(candidates, self.spot_context, len(audio) / SAMPLE_RATE)
+        print(f"Confirming {len(candidates)} candidate(s) in {len(windows)} window(s) "
+              f"({sum(end - start for start, end in windows):.1f}s) with '{self.model_name}'...")
+        if not self.model:
+            self.initialize_model()
+        
+        window_words = []
+        with self.metrics.span("transcribe", audio_file, model=self.model_name, spotted=True) as span:
+            for start, end in windows:
+                samples = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+                result = self._run_model(samples, self._options(coarse.language, verbose=False))
+                window_words.append([
+                    dict(word, start=word["start"] + start, end=word["end"] + start)
+                    for segment in result["segments"] for word in segment["words"]
+                ])
+            span["windows"] = len(windows)
+        
+        segments = merge_segments(coarse.segments, windows, window_words)
+        transcription = TranscriptionResult(
+            text="".join(segment["text"] for segment in segments),
+            language=coarse.language,
+            segments=segments,
+            words=[word for segment in segments for word in segment["words"]]
         )
+        self.save_cached(audio_file, transcription, keywords)
+        return transcription
+    
+    @property
+    def batched(self) -> bool:
+        """Whether files are transcribed by the batched engine."""
+        return self.batch_size > 1 and not self.stream_window and self.backend.batchable
+    
+    def transcribe_batch(self, audio_files: Iterable[Path],
+                         needs_transcription: Optional[Callable[[Path], bool]] = None
+                         ) -> Iterator[Tuple[Path, Optional[TranscriptionResult]]]:
+        """Transcribe several files, decoding 30 s windows of all of them in shared batches.
+        
+        Yields (audio_file, transcription) in input order as soon as every
+        window of a file is decoded. Only the windows waiting for a batch are
+        held in memory, the audio itself is decoded incrementally. Files for
+        which needs_transcription returns False are yielded in order with None.
+        """
+        return self._transcribe_batched(((audio_file, None) for audio_file in audio_files),
+                                        needs_transcription)
+    
+    def _transcribe_batched(self, jobs: Iterable[Tuple[Path, Optional[np.ndarray]]],
+                            needs_transcription: Optional[Callable[[Path], bool]] = None
+                            ) -> Iterator[Tuple[Path, Optional[TranscriptionResult]]]:
+        files = deque()
+        pending: List[_BatchWindow] = []
+        overlap = min(self.stream_overlap, N_SAMPLES / SAMPLE_RATE / 2)
+        
+        def decode_pending() -> None:
+            with self.metrics.span("decode_batch", windows=len(pending),
+                                   files=len({id(window.file) for window in pending})):
+                window_segments = self._decode_windows(pending)
+            # Windows are merged in the order they were cut, per file
+            for window, segments in zip(pending, window_segments):
+                state = window.file
+                state.window_words.append(state.merger.merge(segments, window.start, window.end,
+                                                             window.is_last))
+            pending.clear()
+        
+        def finished() -> Iterator[Tuple[Path, TranscriptionResult]]:
+            while files and (files[0].skipped or files[0].result is not None or
+                             (files[0].all_cut and len(files[0].window_words) == files[0].windows)):
+                state = files.popleft()
+                if state.result is None and not state.skipped:
+                    state.result = assemble_windows(state.language or self.language, state.window_words)
+                    self.save_cached(state.audio_file, state.result)
+                    print(f"Transcribed {state.audio_file.name} ({state.windows} windows, "
+                          f"language: {state.result.language})")
+                yield state.audio_file, state.result
+        
+        for audio_file, audio in jobs:
+            state = _BatchedFile(audio_file, self.language, WindowMerger(overlap))
+            files.append(state)
+            if needs_transcription is not None and not needs_transcription(audio_file):
+                state.skipped = True
+            else:
+                state.result = self.load_cached(audio_file)
+            if state.result is None and not state.skipped:
+                if not self.model:
+                    self.initialize_model()
+                with self.metrics.span("transcribe", audio_file, model=self.model_name, batched=True):
+                    for window in self._batch_windows(state, audio):
+                        pending.append(window)
+                        if len(pending) >= self.batch_size:
+                            decode_pending()
+                state.all_cut = True
+            yield from finished()
+        
+        if pending:
+            decode_pending()
+        yield from finished()
+    
+    def _overlapping_windows(self, audio_file: Path, audio: Optional[np.ndarray], window: int,
+                             overlap: int) -> Iterator[Tuple[np.ndarray, int, bool]]:
+        """Yield (samples, offset, is_last) for windows of window samples overlapping by overlap."""
+        step = window - overlap
+        buffer = np.empty(0, dtype=np.float32)
+        buffer_offset = 0  # Absolute sample position of buffer[0]
+        for chunk in self._pcm_chunks(audio_file, audio, step):
+            buffer = np.concatenate([buffer, chunk])
+            while len(buffer) >= window:
+                yield buffer[:window], buffer_offset, False
+                buffer = buffer[step:]
+                buffer_offset += step
+        
+        # The tail, including the part of the last overlap not yet emitted
+        if len(buffer):
+            yield buffer, buffer_offset, True
+    
+    def _batch_windows(self, state: _BatchedFile, audio: Optional[np.ndarray]) -> Iterator[_BatchWindow]:
+        """Cut a file into 30 s log-mel windows for the batched engine."""
+        overlap = min(int(self.stream_overlap * SAMPLE_RATE), N_SAMPLES // 2)
+        for samples, offset, is_last in self._overlapping_windows(state.audio_file, audio,
+                                                                   N_SAMPLES, overlap):
+            state.windows += 1
+            mel = None
+            if not self.vad or self.vad.detect(samples):
+                mel = pad_or_trim(log_mel_spectrogram(samples, self.model.dims.n_mels), N_FRAMES)
+                if state.language is None:
+                    # Detect once per file so all of its windows use the same language
+                    _, probs = self.model.detect_language(mel.unsqueeze(0).to(self.device))
+                    state.language = max(probs[0], key=probs[0].get)
+            yield _BatchWindow(state, offset / SAMPLE_RATE, (offset + len(samples)) / SAMPLE_RATE,
+                               is_last, mel, len(samples) // HOP_LENGTH)
+    
+    def _decode_windows(self, windows: List[_BatchWindow]) -> List[List[dict]]:
+        """Decode a batch of windows and return the segments with word timestamps of each."""
+        window_segments: List[List[dict]] = [[] for _ in windows]
+        by_language: Dict[str, List[int]] = {}
+        for i, window in enumerate(windows):
+            if window.mel is not None:
+                by_language.setdefault(window.file.language, []).append(i)
+        
+        for language, indices in by_language.items():
+            mels = torch.stack([windows[i].mel for i in indices]).to(self.device)
+            options = whisper.DecodingOptions(language=language, task="transcribe",
+                                              fp16=self.device == "cuda")
+            results = self.model.decode(mels, options)
+            tokenizer = get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                      language=language, task="transcribe")
+            for mel, i, result in zip(mels, indices, results):
+                # Same no-speech rule as whisper.transcribe
+                if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+                    continue
+                duration = windows[i].num_frames * HOP_LENGTH / SAMPLE_RATE
+                segments = _token_segments(list(result.tokens), tokenizer, duration)
+                add_word_timestamps(segments=segments, model=self.model, tokenizer=tokenizer,
+                                    mel=mel, num_frames=windows[i].num_frames,
+                                    last_speech_timestamp=0.0)
+                window_segments[i] = segments
+        return window_segments
+    
+    def _run_model(self, audio, options: Dict[str, Any]) -> dict:
+        """Run Whisper on a file path or PCM buffer, skipping non-speech audio when VAD is enabled.
+        
+        Timestamps in the returned result always refer to the audio passed in.
+        """
+        if not self.vad:
+            return self.backend.transcribe(self.model, audio, options)
+        
+        with self.metrics.span("vad") as span:
+            if not isinstance(audio, np.ndarray):
+                audio = decode_pcm(Path(audio))
+            timeline = SpeechTimeline(self.vad.detect(audio))
+            span["audio_seconds"] = len(audio) / SAMPLE_RATE
+            span["speech_seconds"] = timeline.speech_samples / SAMPLE_RATE
+        if options.get('verbose'):
+            print(f"Voice activity: {timeline.speech_samples / SAMPLE_RATE:.1f}s of "
+                  f"{len(audio) / SAMPLE_RATE:.1f}s in {len(timeline.regions)} region(s)")
+        
+        if not timeline.regions:
+            return {"text": "", "language": options.get('language'), "segments": []}
+        result = self.backend.transcribe(self.model, timeline.compact(audio), options)
+        return timeline.map_result(result)
+    
+    def settings(self, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Everything that affects the transcription of a file, e.g. to check a stored result."""
+        return {"model": self.model_name, "language": self.language,
+                "options": self._key_options(keywords if self.spot_model else None)}
+    
+    def _key_options(self, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Options besides model and language that change the transcription."""
+        # 'verbose' only affects console output, not the result
+        key_options = {k: v for k, v in self._options().items() if k != 'verbose'}
+        if self.stream_window:
+            key_options['stream_window'] = self.stream_window
+            key_options['stream_overlap'] = self.stream_overlap
+        if self.backend.name != "whisper":
+            # Kept out of the key for the default backend so existing entries stay valid
+            key_options['backend'] = self.backend.name
+        if self.batched:
+            # The batch size does not change the result, the window layout does
+            key_options['batched_overlap'] = self.stream_overlap
+        if self.vad:
+            key_options['vad'] = self.vad.settings()
+        if keywords:
+            # Spotted transcriptions depend on the keywords that were confirmed
+            key_options['spot'] = {'model': self.spot_model, 'context': self.spot_context,
+                                   'keywords': sorted(keywords)}
+        return key_options
+    
+    def _cache_key(self, audio_file: Path, keywords: Optional[List[str]] = None) -> str:
+        """Cache key covering the audio content and every option that affects the result."""
+        key_options = self._key_options(keywords)
+        stat = audio_file.stat()
+        hash_id = (str(audio_file.resolve()), stat.st_size, stat.st_mtime_ns)
+        # Lookup and store happen for the same file, hash it only once
+        if self._hash_id != hash_id:
+            self._hash_id = hash_id
+            self._audio_hash = self.cache.hash_file(audio_file)
+        return self.cache.make_key(self._audio_hash, self.model_name, self.language, key_options)
+    
+    def load_cached(self, audio_file: Path,
+                    keywords: Optional[List[str]] = None) -> Optional[TranscriptionResult]:
+        """Return the cached transcription of audio_file, or None if there is none."""
+        if not self.cache:
+            return None
+        with self.metrics.span("cache_lookup", audio_file) as span:
+            cached = self.cache.get(self._cache_key(audio_file, keywords))
+            span["hit"] = cached is not None
+        if cached is None:
+            return None
+        print(f"[green]Using cached transcription for {audio_file.name}[/green]")
+        return TranscriptionResult(**cached)
+    
+    def save_cached(self, audio_file: Path, transcription: TranscriptionResult,
+                    keywords: Optional[List[str]] = None) -> None:
+        """Store the transcription of audio_file in the cache, if caching is enabled."""
+        if self.cache:
+            self.cache.put(self._cache_key(audio_file, keywords), asdict(transcription))
+    
+    def stream_words(self, audio_file: Path, audio: Optional[np.ndarray] = None) -> Iterator[dict]:
+        """Yield words with absolute timestamps as each streaming window is transcribed."""
+        for _, _, _, words in self.stream_windows(audio_file, audio):
+            yield from words
+    
+    def _transcribe_streamed(self, audio_file: Path, audio: Optional[np.ndarray] = None) -> TranscriptionResult:
+        """Transcribe in overlapping windows and assemble a regular TranscriptionResult."""
+        print(f"Transcribing audio in {self.stream_window:g}s windows "
+              f"({self.stream_overlap:g}s overlap)...")
+        language = self.language
+        window_words = []
+        for language, _, _, words in self.stream_windows(audio_file, audio):
+            window_words.append(words)
+        print(f"Detected language: {language}")
+        
+        return assemble_windows(language, window_words)
+    
+    def _pcm_chunks(self, audio_file: Path, audio: Optional[np.ndarray],
+                    chunk_samples: int) -> Iterator[np.ndarray]:
+        """Yield PCM chunks from the shared buffer if present, otherwise decode incrementally."""
+        if audio is None:
+            yield from stream_pcm(audio_file, chunk_samples)
+        else:
+            for offset in range(0, len(audio), chunk_samples):
+                yield audio[offset:offset + chunk_samples]
+    
+    def stream_progress(self, stored: Optional[dict] = None) -> StreamProgress:
+        """Progress for stream_windows: the stored one if it has the current window layout, else a new one."""
+        window = int((self.stream_window or 30.0) * SAMPLE_RATE)
+        overlap = min(int(self.stream_overlap * SAMPLE_RATE), window // 2)
+        if stored and (stored.get("window"), stored.get("overlap")) == (window, overlap):
+            return StreamProgress(**stored)
+        return StreamProgress(window=window, overlap=overlap)
+    
+    def stream_windows(self, audio_file: Path, audio: Optional[np.ndarray] = None,
+                       progress: Optional[StreamProgress] = None
+                       ) -> Iterator[Tuple[str, float, float, List[dict]]]:
+        """Transcribe overlapping windows and yield (language, start, end, words) per window.
+        
+        Windows are joined by WindowMerger. Memory use is bounded by the
+        window size. progress is updated after every window; the windows a
+        stored progress already covers are skipped without transcribing them.
+        """
+        if not self.model:
+            self.initialize_model()
+        
+        progress = progress or self.stream_progress()
+        window, overlap = progress.window, progress.overlap
+        done = progress.windows
+        
+        language = progress.language or self.language
+        merger = WindowMerger(overlap / SAMPLE_RATE)
+        if progress.merger:
+            merger.restore(progress.merger)
+        
+        def transcribe_window(samples: np.ndarray, offset: int, is_last: bool):
+            nonlocal language
+            result = self._run_model(samples, self._options(language, verbose=False))
+            # Keep the language of the first window so all windows are consistent
+            language = language or result["language"]
+            
+            window_start = offset / SAMPLE_RATE
+            window_end = (offset + len(samples)) / SAMPLE_RATE
+            words = merger.merge(result["segments"], window_start, window_end, is_last)
+            progress.windows += 1
+            progress.language = language
+            progress.merger = merger.state()
+            return language, window_start, window_end, words
+        
+        windows = self._overlapping_windows(audio_file, audio, window, overlap)
+        for index, (samples, offset, is_last) in enumerate(windows):
+            if index >= done:
+                yield transcribe_window(samples, offset, is_last)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from rich import print
 
 def ensure_directories(input_dir: Path, output_dir: Path) -> Tuple[Path, Path]:
@@ -9,9 +9,36 @@ def ensure_directories(input_dir: Path, output_dir: Path) -> Tuple[Path, Path]:
     
     return input_dir, output_dir
 
-def get_audio_files(input_dir: Path) -> List[Path]:
-    """Get all MP3 and OGG files from input directory."""
-    audio_files = list(input_dir.glob('*.mp3')) + list(input_dir.glob('*.ogg'))
+AUDIO_EXTENSIONS = ('.mp3', '.ogg', '.opus', '.wav', '.m4a', '.flac')
+
+def list_audio_files(input_dir: Path, recursive: bool = False,
+                     exclude: Optional[Path] = None) -> List[Path]:
+    """List the supported audio files in input directory, and its subdirectories if recursive.
+    
+    Files below exclude, e.g. an output directory inside the input directory, are skipped.
+    """
+    paths = input_dir.rglob('*') if recursive else input_dir.iterdir()
+    exclude = exclude.resolve() if exclude else None
+    return [path for path in sorted(paths)
+            if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+            and not (exclude and path.resolve().is_relative_to(exclude))]
+
+def get_audio_files(input_dir: Path, recursive: bool = False,
+                    exclude: Optional[Path] = None) -> List[Path]:
+    """Get all supported audio files from input directory.
+    
+    Every file is split into a folder named after it, so of several files
+    with the same name (in different subdirectories) only the first is used.
+    """
+    audio_files = []
+    seen = {}
+    for path in list_audio_files(input_dir, recursive, exclude):
+        if path.stem in seen:
+            print(f"[yellow]Warning: Skipping {path}, its output folder would be the same as "
+                  f"for {seen[path.stem]}[/yellow]")
+            continue
+        seen[path.stem] = path
+        audio_files.append(path)
     
     if not audio_files:
         print("[yellow]Warning: No audio files found in input directory[/yellow]")
@@ -0,0 +1,117 @@
+from bisect import bisect_right
+from typing import List, Tuple
+import numpy as np
+
+from audio_io import SAMPLE_RATE
+
+class VoiceActivityDetector:
+    """Energy-based detector for the parts of a recording that contain speech.
+
+    The signal is cut into short frames and a frame counts as active when its
+    energy is threshold_db above the noise floor of the recording (the 10th
+    percentile of all frame energies), and at least min_db. Short gaps are
+    bridged, very short bursts are dropped and every region is padded so
+    Whisper sees the beginning and end of each phrase.
+    """
+
+    def __init__(self, threshold_db: float = 12.0, min_db: float = -50.0,
+                 padding: float = 0.5, min_silence: float = 1.0, min_speech: float = 0.25,
+                 frame_seconds: float = 0.03, sample_rate: int = SAMPLE_RATE):
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.padding = padding
+        self.min_silence = min_silence
+        self.min_speech = min_speech
+        self.frame_seconds = frame_seconds
+        self.sample_rate = sample_rate
+
+    def settings(self) -> dict:
+        """Settings that change which audio is transcribed, used in the cache key."""
+        return {
+            "threshold_db": self.threshold_db,
+            "min_db": self.min_db,
+            "padding": self.padding,
+            "min_silence": self.min_silence,
+            "min_speech": self.min_speech,
+            "frame_seconds": self.frame_seconds
+        }
+
+    def frame_energy_db(self, samples: np.ndarray) -> np.ndarray:
+        """Energy of every full frame in dBFS."""
+        frame = int(self.frame_seconds * self.sample_rate)
+        frames = samples[:len(samples) // frame * frame].reshape(-1, frame)
+        # einsum avoids materializing a squared copy of the whole recording
+        power = np.einsum('ij,ij->i', frames, frames) / frame
+        return 10 * np.log10(power + 1e-10)
+
+    def detect(self, samples: np.ndarray) -> List[Tuple[int, int]]:
+        """Return the padded speech regions as sorted (start, end) sample indices."""
+        frame = int(self.frame_seconds * self.sample_rate)
+        energy = self.frame_energy_db(samples)
+        if not len(energy):
+            return [(0, len(samples))] if len(samples) else []
+        threshold = max(np.percentile(energy, 10) + self.threshold_db, self.min_db)
+        active = np.concatenate([[False], energy > threshold, [False]])
+        # Indices where runs of active frames start and end
+        edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+        runs = [(int(start) * frame, int(end) * frame) for start, end in zip(edges[::2], edges[1::2])]
+
+        # Bridge short pauses within a phrase
+        merged: List[List[int]] = []
+        for start, end in runs:
+            if merged and start - merged[-1][1] < self.min_silence * self.sample_rate:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+
+        padding = int(self.padding * self.sample_rate)
+        regions: List[Tuple[int, int]] = []
+        for start, end in merged:
+            if end - start < self.min_speech * self.sample_rate:
+                continue
+            start = max(0, start - padding)
+            end = min(len(samples), end + padding)
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], end)
+            else:
+                regions.append((start, end))
+        return regions
+
+class SpeechTimeline:
+    """Maps times in the concatenated speech regions back to the original recording."""
+
+    def __init__(self, regions: List[Tuple[int, int]], sample_rate: int = SAMPLE_RATE):
+        self.regions = regions
+        self.sample_rate = sample_rate
+        # Start of each region within the concatenated audio
+        self.offsets = []
+        position = 0
+        for start, end in regions:
+            self.offsets.append(position)
+            position += end - start
+        self.speech_samples = position
+
+    def compact(self, samples: np.ndarray) -> np.ndarray:
+        """Concatenate the speech regions of samples into one buffer."""
+        if len(self.regions) == 1 and self.regions[0] == (0, len(samples)):
+            return samples
+        return np.concatenate([samples[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds: float) -> float:
+        """Convert a time in the concatenated audio to a time in the original audio."""
+        position = round(seconds * self.sample_rate)
+        index = max(0, bisect_right(self.offsets, position) - 1)
+        start, end = self.regions[index]
+        # Timestamps past the end of a region are clamped to that region
+        original = min(start + position - self.offsets[index], end)
+        return original / self.sample_rate
+
+    def map_result(self, result: dict) -> dict:
+        """Shift the segment and word timestamps of a Whisper result onto the original timeline."""
+        for segment in result["segments"]:
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"])
+            for word in segment.get("words", []):
+                word["start"] = self.to_original(word["start"])
+                word["end"] = self.to_original(word["end"])
+        return result
@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import time
+from rich import print
+
+from transcription import TranscriptionManager
+from audio_processor import AudioProcessor
+from pipeline import SplitOptions, run_file
+from batch import WorkerPool
+from work_queue import WorkQueue
+from utils import list_audio_files
+
+class StableFileWatcher:
+    """Polls a directory and reports audio files once they stopped changing.
+
+    A file counts as stable when its size and modification time were the
+    same for stable_seconds, so uploads that are still being copied are
+    not picked up.
+    """
+
+    def __init__(self, input_dir: Path, stable_seconds: float = 5.0):
+        self.input_dir = input_dir
+        self.stable_seconds = stable_seconds
+        self._seen: Dict[Path, Tuple[int, int, float]] = {}  # path -> (size, mtime_ns, unchanged since)
+        self._reported: Dict[Path, Tuple[int, int]] = {}
+
+    def poll(self) -> List[Path]:
+        """Return files that became stable since the last poll."""
+        now = time.monotonic()
+        stable = []
+        present = set()
+        for audio_file in list_audio_files(self.input_dir):
+            try:
+                stat = audio_file.stat()
+            except FileNotFoundError:
+                continue
+            present.add(audio_file)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._seen.get(audio_file)
+            if previous is None or previous[:2] != signature:
+                self._seen[audio_file] = signature + (now,)
+                continue
+            if now - previous[2] >= self.stable_seconds and self._reported.get(audio_file) != signature:
+                self._reported[audio_file] = signature
+                stable.append(audio_file)
+
+        # Forget files that were moved away or deleted
+        for audio_file in list(self._seen):
+            if audio_file not in present:
+                self._seen.pop(audio_file)
+                self._reported.pop(audio_file, None)
+        return stable
+
+def run_watch(input_dir: Path, transcriber: TranscriptionManager, processor: AudioProcessor,
+              options: SplitOptions, queue_file: Path, jobs: int = 1, pipelined: bool = False,
+              threads_per_job: Optional[int] = None, poll_interval: float = 2.0,
+              stable_seconds: float = 5.0) -> None:
+    """Watch input_dir and process new files through a durable queue until interrupted."""
+    queue = WorkQueue(queue_file)
+    requeued = queue.requeue_interrupted()
+    if requeued:
+        print(f"Resuming {requeued} file(s) interrupted in a previous run")
+
+    watcher = StableFileWatcher(input_dir, stable_seconds)
+    pool = None
+    if jobs > 1:
+        pool = WorkerPool(jobs, transcriber, processor, options, pipelined, threads_per_job)
+        pool.start()
+    in_flight: Dict[str, int] = {}  # path -> queue item id
+
+    print(f"[green]Watching {input_dir} (queue: {queue_file}), press Ctrl+C to stop[/green]")
+    try:
+        while True:
+            for audio_file in watcher.poll():
+                if queue.enqueue(audio_file):
+                    print(f"Queued {audio_file.name}")
+
+            # Hand pending items to the workers, or process one inline
+            while len(in_flight) < jobs:
+                item = queue.claim()
+                if item is None:
+                    break
+                item_id, audio_file = item
+                if not audio_file.exists():
+                    queue.mark_failed(item_id, "File no longer exists")
+                    continue
+                if pool:
+                    in_flight[str(audio_file)] = item_id
+                    pool.submit(audio_file)
+                    continue
+                print(f"\n[bold blue]Processing {audio_file.name}...[/bold blue]")
+                try:
+                    run_file(audio_file, transcriber, processor, options, pipelined)
+                    queue.mark_done(item_id)
+                except Exception as e:
+                    print(f"[red]Failed {audio_file.name}: {e}[/red]")
+                    queue.mark_failed(item_id, f"{type(e).__name__}: {e}")
+
+            if pool and in_flight:
+                outcomes = pool.poll(timeout=poll_interval)
+            else:
+                # Idle workers are checked too, so one that died is replaced before a file reaches it
+                outcomes = pool.poll(timeout=0) if pool else []
+                time.sleep(poll_interval)
+            for outcome in outcomes:
+                item_id = in_flight.pop(outcome.file)
+                if outcome.status == "done":
+                    queue.mark_done(item_id)
+                    print(f"[green]Finished {Path(outcome.file).name} ({outcome.splits} parts)[/green]")
+                else:
+                    queue.mark_failed(item_id, outcome.error)
+                    print(f"[red]Failed {Path(outcome.file).name}: {outcome.error}[/red]")
+    except KeyboardInterrupt:
+        print("Stopping watcher")
+    finally:
+        if pool:
+            pool.shutdown()
+        counts = queue.counts()
+        print(f"Queue: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+              f"{counts.get('pending', 0) + counts.get('processing', 0)} pending")
+        queue.close()
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import List, Optional
+import gzip
+import json
+import os
+import tempfile
+
+# Bump when the stored layout changes
+WORDS_FORMAT_VERSION = 1
+
+WORDS_SUFFIX = "_words.json.gz"
+
+def words_file(output_dir: Path, base_name: str) -> Path:
+    """Path of the word sidecar of base_name in its output directory."""
+    return output_dir / f"{base_name}{WORDS_SUFFIX}"
+
+def save_words(path: Path, text: str, language: Optional[str], segments: List[dict],
+               source: Optional[str] = None) -> None:
+    """Atomically write a transcription with all word timestamps in a compact columnar form.
+
+    Every word attribute is stored as one array instead of one object per
+    word, and the file is gzipped, so the sidecar is a fraction of the size
+    of the equivalent JSON. Segments are stored as their bounds and word count.
+    """
+    words = [word for segment in segments for word in segment["words"]]
+    data = {
+        "version": WORDS_FORMAT_VERSION,
+        "source": source,
+        "text": text,
+        "language": language,
+        "words": {
+            "word": [word["word"] for word in words],
+            "start": [word["start"] for word in words],
+            "end": [word["end"] for word in words],
+            "probability": [word.get("probability") for word in words]
+        },
+        "segments": {
+            "start": [segment["start"] for segment in segments],
+            "end": [segment["end"] for segment in segments],
+            "words": [len(segment["words"]) for segment in segments]
+        }
+    }
+    encoded = gzip.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encoded)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+def load_words(path: Path) -> dict:
+    """Read a word sidecar back into the layout of TranscriptionResult (text, language, segments, words).
+
+    Also returns "source", the name of the transcribed audio file.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != WORDS_FORMAT_VERSION:
+        raise ValueError(f"Unsupported word file version in {path}")
+
+    columns = data["words"]
+    words = [
+        {"word": word, "start": start, "end": end, "probability": probability}
+        for word, start, end, probability in zip(columns["word"], columns["start"],
+                                                 columns["end"], columns["probability"])
+    ]
+    segments = []
+    offset = 0
+    for start, end, count in zip(data["segments"]["start"], data["segments"]["end"],
+                                 data["segments"]["words"]):
+        segment_words = words[offset:offset + count]
+        offset += count
+        segments.append({
+            "id": len(segments),
+            "start": start,
+            "end": end,
+            "text": "".join(word["word"] for word in segment_words),
+            "words": segment_words
+        })
+    return {
+        "source": data.get("source"),
+        "text": data["text"],
+        "language": data["language"],
+        "segments": segments,
+        "words": words
+    }
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Optional, Tuple
+import sqlite3
+import time
+
+class WorkQueue:
+    """Durable on-disk queue of audio files backed by SQLite.
+
+    A file is identified by its path, size and modification time, so a file
+    that was already processed is never queued again, while a new recording
+    reusing an old name is. Items claimed by a run that was interrupted are
+    put back to pending when the queue is reopened.
+    """
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                enqueued_at REAL NOT NULL,
+                finished_at REAL,
+                UNIQUE (path, size, mtime_ns)
+            )
+        """)
+        self.conn.commit()
+
+    def requeue_interrupted(self) -> int:
+        """Return items left in 'processing' by a previous run to 'pending'."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE files SET status = 'pending' WHERE status = 'processing'"
+            )
+        return cursor.rowcount
+
+    def enqueue(self, audio_file: Path) -> bool:
+        """Add a file to the queue; returns False if this exact file is already known."""
+        stat = audio_file.stat()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO files (path, size, mtime_ns, enqueued_at) VALUES (?, ?, ?, ?)",
+                (str(audio_file), stat.st_size, stat.st_mtime_ns, time.time())
+            )
+        return cursor.rowcount == 1
+
+    def claim(self) -> Optional[Tuple[int, Path]]:
+        """Mark the oldest pending item as processing and return (id, path)."""
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT id, path FROM files WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE files SET status = 'processing', attempts = attempts + 1 WHERE id = ?",
+                (row[0],)
+            )
+        return row[0], Path(row[1])
+
+    def mark_done(self, item_id: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET status = 'done', error = NULL, finished_at = ? WHERE id = ?",
+                (time.time(), item_id)
+            )
+
+    def mark_failed(self, item_id: int, error: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), item_id)
+            )
+
+    def counts(self) -> dict:
+        """Number of items per status."""
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        self.conn.close()